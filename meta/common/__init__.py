@@ -3,12 +3,12 @@ import os.path
 import datetime
 import hashlib
 import sys
+import threading
 from urllib.parse import urlparse
-from typing import Any, Optional, Callable
+from typing import Any, Optional, Callable, NamedTuple
 
 import requests
 from cachecontrol import CacheControl  # type: ignore
-from cachecontrol.caches import FileCache  # type: ignore
 
 LAUNCHER_MAVEN = "https://files.prismlauncher.org/maven/%s"
 
@@ -38,6 +38,18 @@ def upstream_path():
     return "upstream"
 
 
+def launcher_manifest_path(file_path: str) -> Optional[str]:
+    """
+    Path of the manifest sidecar for a file in the launcher dir, or None if the file is not in the launcher dir.
+    """
+    relpath = os.path.relpath(
+        os.path.abspath(file_path), os.path.abspath(launcher_path())
+    )
+    if relpath.startswith(os.pardir):
+        return None
+    return os.path.join(cache_path(), "launcher_manifest", relpath)
+
+
 def ensure_upstream_dir(path):
     path = os.path.join(upstream_path(), path)
     if not os.path.exists(path):
@@ -81,12 +93,32 @@ def merge_dict(base: dict[Any, Any], overlay: dict[Any, Any]):
     return overlay
 
 
+# one session per process, so stages running in the same interpreter share connections and cache
+_session = None
+
+
 def default_session():
-    cache = FileCache(os.path.join(cache_path(), "http_cache"))
+    global _session
+    if _session is not None:
+        return _session
+
+    from .http_cache import BoundedFileCache
+
+    cache = BoundedFileCache(os.path.join(cache_path(), "http_cache"))
     sess = CacheControl(requests.Session(), cache)
 
     sess.headers.update({"User-Agent": "PrismLauncherMeta/1.0"})
 
+    _session = sess
+    return sess
+
+
+def uncached_session():
+    """
+    A session that bypasses the HTTP cache, for conditional requests that have to see the server's 304.
+    """
+    sess = requests.Session()
+    sess.headers.update({"User-Agent": "PrismLauncherMeta/1.0"})
     return sess
 
 
@@ -113,6 +145,44 @@ def file_hash(
     return hashtype.hexdigest()
 
 
+class FileDigests(NamedTuple):
+    size: int
+    sha1: str
+    sha256: str
+
+
+def temp_file_path(file_path: str) -> str:
+    """
+    Where to write a file before moving it into place. Hidden, so that a crash doesn't leave it where it gets indexed.
+    """
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_if_changed(file_path: str, data: bytes) -> bool:
+    """
+    Atomically replaces the file with data, unless it already has exactly that content.
+    Returns whether the file was written.
+    """
+    try:
+        if os.path.getsize(file_path) == len(data):
+            with open(file_path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+
+    tmp_path = temp_file_path(file_path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        remove_files([tmp_path])
+        raise
+    return True
+
+
 def get_file_sha1_from_file(file_name: str, sha1_file: str) -> Optional[str]:
     if os.path.isfile(sha1_file):
         with open(sha1_file, "r") as file:
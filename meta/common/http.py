@@ -1,6 +1,325 @@
-def download_binary_file(sess, path, url):
-    with open(path, "wb") as f:
+import concurrent.futures
+import hashlib
+import io
+import os
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+from meta.common import (
+    FileDigests,
+    default_session,
+    eprint,
+    remove_files,
+    temp_file_path,
+    uncached_session,
+)
+from meta.common.store import JsonStore, record_file_digests, static_fingerprint
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def download_binary_file(sess, path, url, chunk_size: int = 1 << 20) -> FileDigests:
+    """
+    Streams url into path, hashing it on the way. The file only appears at path once it's complete.
+    """
+    sha1 = hashlib.sha1()
+    sha256 = hashlib.sha256()
+    size = 0
+    tmp_path = temp_file_path(path)
+    try:
+        with sess.get(url, stream=True) as r:
+            r.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    sha1.update(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_files([tmp_path])
+        raise
+    digests = FileDigests(size, sha1.hexdigest(), sha256.hexdigest())
+    record_file_digests(path, {"sha1": digests.sha1, "sha256": digests.sha256})
+    return digests
+
+
+def fetch_checksum(sess, url: str) -> Optional[str]:
+    """
+    Fetches a checksum file like the .sha1 and .sha256 files next to maven artifacts, or returns None if that fails.
+    """
+    try:
         r = sess.get(url)
         r.raise_for_status()
-        for chunk in r.iter_content(chunk_size=128):
-            f.write(chunk)
+    except Exception:
+        return None
+    # some checksum files also name the file they are for
+    fields = r.text.split()
+    return fields[0].lower() if fields else None
+
+
+class RangeRequestsUnsupported(Exception):
+    pass
+
+
+class HttpRangeFile(io.RawIOBase):
+    """
+    Read-only file over HTTP range requests. The end of the file is fetched up front,
+    as that's where zip files keep their central directory.
+    """
+
+    def __init__(self, sess, url: str, tail_size: int = 65536):
+        self.sess = sess
+        self.url = url
+        self.position = 0
+
+        r = self._request(f"bytes=-{tail_size}")
+        self.size = int(r.headers["Content-Range"].rsplit("/", 1)[1])
+        self.tail = r.content
+        self.tail_start = self.size - len(self.tail)
+
+    def _request(self, byte_range: str):
+        r = self.sess.get(
+            self.url,
+            headers={
+                "Range": byte_range,
+                "Accept-Encoding": "identity",
+                # a cached response would be the full file
+                "Cache-Control": "no-cache",
+            },
+            stream=True,
+        )
+        r.raise_for_status()
+        content_range = r.headers.get("Content-Range", "")
+        if r.status_code != 206 or content_range.endswith("/*"):
+            r.close()
+            raise RangeRequestsUnsupported(self.url)
+        return r
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+        self.position = offset
+        return self.position
+
+    def readinto(self, b) -> int:
+        start = self.position
+        end = min(start + len(b), self.size)
+        if start >= end:
+            return 0
+        if start >= self.tail_start:
+            data = self.tail[start - self.tail_start : end - self.tail_start]
+        else:
+            end = min(end, self.tail_start)
+            data = self._request(f"bytes={start}-{end - 1}").content
+        b[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class RemoteZipFile(zipfile.ZipFile):
+    """
+    Zip file read over HTTP, only downloading the central directory and the entries that get opened.
+    Raises RangeRequestsUnsupported if the server doesn't do range requests.
+    """
+
+    def __init__(self, sess, url: str, buffer_size: int = 65536):
+        remote = HttpRangeFile(sess, url)
+        self.size = remote.size
+        self.reader = io.BufferedReader(remote, buffer_size)
+        super().__init__(self.reader)
+
+    def close(self):
+        # ZipFile leaves file objects it was given open
+        super().close()
+        self.reader.close()
+
+
+# rate limiting and server errors that are usually gone after a moment
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ConcurrentFetcher:
+    """
+    The fetch core of the update stages: runs jobs on a bounded thread pool and sends their requests through one
+    session, limiting requests in flight globally and per host, and retrying failed requests with exponential backoff.
+    get() and head() can be used wherever a session's methods are.
+    """
+
+    def __init__(
+        self,
+        sess,
+        max_workers: int = 16,
+        max_per_host: int = 8,
+        max_in_flight: int = 32,
+        retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.sess = sess
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def _delay(self, attempt: int, r=None) -> float:
+        retry_after = r.headers.get("Retry-After") if r is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        Sends a request, retrying connection errors and retryable status codes.
+        The limits only cover sending the request, streamed bodies are read afterwards.
+        """
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                with self._in_flight, self.host_limit(url):
+                    r = self.sess.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = self._delay(attempt)
+                eprint(f"Retrying {url} in {delay:.0f}s: {e}")
+            else:
+                if r.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return r
+                delay = self._delay(attempt, r)
+                eprint(f"Retrying {url} in {delay:.0f}s: HTTP {r.status_code}")
+                r.close()
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        # like requests.head
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """
+        Like the builtin map, but runs fn concurrently. Results are yielded in the order of items.
+        """
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            yield from executor.map(fn, items)
+
+
+# one fetcher per process, so the limits hold across stages running in the same interpreter
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def default_fetcher() -> ConcurrentFetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ConcurrentFetcher(default_session())
+        return _fetcher
+
+
+class Revalidator:
+    """
+    Tells whether the index endpoints of an upstream changed since the last successful update, using conditional
+    requests with the ETag and Last-Modified validators that were recorded for each URL. Those go around the HTTP
+    cache, which would answer a 304 with the response it has stored.
+    New validators are only recorded by commit(), which a stage calls once it succeeded, so failed runs are retried.
+    """
+
+    def __init__(
+        self,
+        sess,
+        name: str,
+        outputs: Iterable[str] = (),
+        static_inputs: Iterable[str] = (),
+    ):
+        self.sess = sess
+        self.conditional_sess = ConcurrentFetcher(uncached_session())
+        self.store = JsonStore(os.path.join("revalidation", name))
+        self.outputs = list(outputs)
+        # like generated files, what gets stored upstream also depends on our code and static files
+        self.static_fingerprint = static_fingerprint(static_inputs)
+        self.responses: Dict[str, Any] = {}
+        self.pending: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def _record(self, url: str, r):
+        self.responses[url] = r
+        self.pending[url] = {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "sha256": hashlib.sha256(r.content).hexdigest(),
+        }
+
+    def is_unchanged(self, url: str) -> bool:
+        known = self.store.get(url)
+        if known is None:
+            return False
+        headers = {}
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+        r = self.conditional_sess.get(url, headers=headers)
+        if r.status_code == 304:
+            return True
+        r.raise_for_status()
+        self._record(url, r)
+        # servers that don't support conditional requests
+        return self.pending[url]["sha256"] == known["sha256"]
+
+    def unchanged(self, urls: Iterable[str]) -> bool:
+        """
+        Whether none of the urls changed, and everything the stage stored last time is still there.
+        """
+        if self.store.get("static") != self.static_fingerprint:
+            return False
+        if not all(os.path.exists(output) for output in self.outputs):
+            return False
+        return all(self.is_unchanged(url) for url in urls)
+
+    def get(self, url: str):
+        """
+        The full response for url, reusing the one fetched while revalidating.
+        """
+        r = self.responses.get(url)
+        if r is None:
+            r = self.sess.get(url)
+            r.raise_for_status()
+            self._record(url, r)
+        return r
+
+    def commit(self):
+        for url, validators in self.pending.items():
+            self.store.set(url, validators)
+        self.store.set("static", self.static_fingerprint)
+        self.store.save()
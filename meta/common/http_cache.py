@@ -0,0 +1,185 @@
+import atexit
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cachecontrol.caches import FileCache  # type: ignore
+
+from .store import JsonStore
+
+MIB = 1 << 20
+
+# responses at least this big, like installer jars, count against the large budget
+LARGE_THRESHOLD = MIB
+
+# cache runs are kept for the hit rate statistics this long
+STATS_RETENTION = 30 * 24 * 60 * 60
+
+# a hit only updates the last access time of an entry once it's this old, so lookups rarely change the index
+ACCESS_RESOLUTION = 60 * 60
+
+
+def _env_bytes(name: str, default: int) -> int:
+    if name in os.environ:
+        return int(os.environ[name]) * MIB
+    return default
+
+
+class BoundedFileCache(FileCache):
+    """
+    FileCache with byte budgets, evicting the least recently used responses when a budget is exceeded.
+    Large responses have their own budget, so a few installer jars can't push out all the small JSON responses.
+    Entries are tracked in an index file next to them, so eviction never has to walk the cache directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        budget: Optional[int] = None,
+        large_budget: Optional[int] = None,
+    ):
+        super().__init__(directory)
+        self.budgets = [
+            (
+                budget
+                if budget is not None
+                else _env_bytes("META_HTTP_CACHE_BUDGET_MB", 512 * MIB)
+            ),
+            (
+                large_budget
+                if large_budget is not None
+                else _env_bytes("META_HTTP_CACHE_LARGE_BUDGET_MB", 2048 * MIB)
+            ),
+        ]
+        self.lock = threading.RLock()
+        self.index = JsonStore("index", directory)
+        self.stats_store = JsonStore("stats", directory)
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.hits = 0
+        self.misses = 0
+        self.unsaved = 0
+
+        if not os.path.exists(self.index.path):
+            # a cache from before the index, or a lost index
+            self._rebuild_index()
+            # even if it's empty, so the next start doesn't walk the directory again
+            self.index.save(force=True)
+        self._compute_totals()
+
+        atexit.register(self.save)
+
+    def _compute_totals(self):
+        self.totals = [0, 0]
+        for size, _ in self.index.data.values():
+            self.totals[size >= LARGE_THRESHOLD] += size
+
+    def _path(self, hashed: str) -> str:
+        return os.path.join(self.directory, *hashed[:5], hashed)
+
+    def _rebuild_index(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".lock") or len(name) != 56:
+                    continue
+                st = os.stat(os.path.join(root, name))
+                self.index.set(name, [st.st_size, st.st_mtime])
+
+    def _track(self, hashed: str, size: Optional[int]):
+        old = self.index.get(hashed)
+        if old is not None:
+            self.totals[old[0] >= LARGE_THRESHOLD] -= old[0]
+        if size is None:
+            self.index.delete(hashed)
+        else:
+            self.index.set(hashed, [size, time.time()])
+            self.totals[size >= LARGE_THRESHOLD] += size
+        self.unsaved += 1
+        if self.unsaved >= 256:
+            self.save()
+
+    def _evict(self, large: bool):
+        # evict down to 90% of the budget, so we don't evict on every write
+        target = self.budgets[large] * 9 // 10
+        entries = sorted(
+            (
+                (last_access, hashed, size)
+                for hashed, (size, last_access) in self.index.data.items()
+                if (size >= LARGE_THRESHOLD) == large
+            ),
+        )
+        for _, hashed, size in entries:
+            if self.totals[large] <= target:
+                break
+            path = self._path(hashed)
+            for file in (path, path + ".lock"):
+                try:
+                    os.remove(file)
+                except FileNotFoundError:
+                    pass
+            self._track(hashed, None)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = super().get(key)
+        hashed = self.encode(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                if hashed in self.index:
+                    self._track(hashed, None)
+            else:
+                self.hits += 1
+                known = self.index.get(hashed)
+                if (
+                    known is None
+                    or known[0] != len(value)
+                    or known[1] < time.time() - ACCESS_RESOLUTION
+                ):
+                    self._track(hashed, len(value))
+        return value
+
+    def set(self, key: str, value: bytes, expires: Any = None) -> None:
+        super().set(key, value, expires)
+        large = len(value) >= LARGE_THRESHOLD
+        with self.lock:
+            self._track(self.encode(key), len(value))
+            if self.totals[large] > self.budgets[large]:
+                self._evict(large)
+
+    def delete(self, key: str) -> None:
+        super().delete(key)
+        with self.lock:
+            self._track(self.encode(key), None)
+
+    def save(self):
+        with self.lock:
+            if self.hits or self.misses:
+                self.stats_store.set(
+                    self.run_id,
+                    {"hits": self.hits, "misses": self.misses, "time": time.time()},
+                )
+            for run_id, run in list(self.stats_store.data.items()):
+                if run["time"] < time.time() - STATS_RETENTION:
+                    self.stats_store.delete(run_id)
+            self.stats_store.save()
+            if self.index.changes:
+                self.index.save()
+                # other processes may have added or evicted entries in the meantime
+                self._compute_totals()
+            self.unsaved = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            sizes = [size for size, _ in self.index.data.values()]
+            runs = list(self.stats_store.data.values())
+            return {
+                "entries": len(sizes),
+                "large_entries": sum(size >= LARGE_THRESHOLD for size in sizes),
+                "bytes": self.totals[False],
+                "large_bytes": self.totals[True],
+                "budget": self.budgets[False],
+                "large_budget": self.budgets[True],
+                "runs": len(runs),
+                "hits": sum(run["hits"] for run in runs),
+                "misses": sum(run["misses"] for run in runs),
+            }
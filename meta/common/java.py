@@ -10,8 +10,12 @@ AZUL_DIR = join(BASE_DIR, "azul")
 ADOPTIUM_VERSIONS_DIR = join(ADOPTIUM_DIR, "versions")
 OPENJ9_VERSIONS_DIR = join(OPENJ9_DIR, "versions")
 AZUL_VERSIONS_DIR = join(AZUL_DIR, "versions")
+# details of all Azul packages, keyed by package uuid
+AZUL_DETAILS_FILE = join(AZUL_DIR, "details.json")
 
 JAVA_MINECRAFT_COMPONENT = "net.minecraft.java"
 JAVA_ADOPTIUM_COMPONENT = "net.adoptium.java"
 JAVA_OPENJ9_COMPONENT = "com.ibm.java"
 JAVA_AZUL_COMPONENT = "com.azul.java"
+# the runtime each of the components above has for every Minecraft version and OS
+JAVA_RESOLUTION_COMPONENT = "net.minecraft.java.resolution"
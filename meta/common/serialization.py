@@ -0,0 +1,107 @@
+import json
+import math
+import os
+import re
+from typing import Any, Callable, Optional
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# set META_JSON_BACKEND=json to always use the standard library
+BACKEND = os.environ.get("META_JSON_BACKEND", "orjson" if orjson else "json")
+
+# indented output puts every scalar value at the end of a line, where it can't be part of a string
+_FLOAT = re.compile(rb"[0-9][.eE][-+0-9]*[0-9],?$", re.MULTILINE)
+_NON_ASCII = re.compile("[^\x00-\x7e]")
+
+
+def _escape_char(match: "re.Match[str]") -> str:
+    # same escapes json.dumps uses with ensure_ascii
+    n = ord(match.group(0))
+    if n > 0xFFFF:
+        n -= 0x10000
+        return "\\u{0:04x}\\u{1:04x}".format(
+            0xD800 | ((n >> 10) & 0x3FF), 0xDC00 | (n & 0x3FF)
+        )
+    return "\\u{0:04x}".format(n)
+
+
+def _double_indent(data: bytes) -> bytes:
+    lines = data.split(b"\n")
+    for i, line in enumerate(lines):
+        content = line.lstrip(b" ")
+        if len(content) != len(line):
+            lines[i] = b" " * (2 * (len(line) - len(content))) + content
+    return b"\n".join(lines)
+
+
+def _has_non_finite(obj: Any) -> bool:
+    # json.dumps writes NaN and Infinity, orjson writes null. Anything we can't look into might turn into one of them.
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(k) or _has_non_finite(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(v) for v in obj)
+    return not isinstance(obj, (str, int, type(None)))
+
+
+def _orjson_dumps(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]],
+    sort_keys: bool,
+    indent: Optional[int],
+) -> Optional[str]:
+    """
+    Serializes obj like json.dumps, or returns None if the result could differ from it.
+    """
+    # without indent, json.dumps separates items with ", " and ": ", which orjson can't do
+    if indent != 4:
+        return None
+    option = (
+        orjson.OPT_INDENT_2
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    try:
+        data = orjson.dumps(obj, default=default, option=option)
+    except (orjson.JSONEncodeError, TypeError):
+        # e.g. integers that don't fit into 64 bits
+        return None
+
+    # floats are formatted differently
+    if _FLOAT.search(data):
+        return None
+    if b"null" in data and _has_non_finite(obj):
+        return None
+
+    data = _double_indent(data)
+    result = data.decode("utf-8")
+    if not result.isascii() or "\x7f" in result:
+        result = _NON_ASCII.sub(_escape_char, result)
+    return result
+
+
+def dumps(
+    obj: Any,
+    *,
+    default: Optional[Callable[[Any], Any]] = None,
+    sort_keys: bool = False,
+    indent: Optional[int] = None,
+    **kwargs: Any,
+) -> str:
+    """
+    Drop-in for json.dumps, producing exactly the same output. Uses orjson when it's available.
+    """
+    if BACKEND == "orjson" and not kwargs:
+        result = _orjson_dumps(obj, default, sort_keys, indent)
+        if result is not None:
+            return result
+    return json.dumps(
+        obj, default=default, sort_keys=sort_keys, indent=indent, **kwargs
+    )
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from filelock import FileLock
+
+from . import cache_path, launcher_path
+
+_DELETED = object()
+
+
+class JsonStore:
+    """
+    A dictionary persisted as JSON in the cache directory, or in directory if given.
+    Changes are kept in memory until save() merges them into the file, so several processes can share a store.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        if directory is None:
+            directory = cache_path()
+        self.path = os.path.join(directory, f"{name}.json")
+        self.lock = threading.Lock()
+        self.data: Dict[str, Any] = self._load()
+        self.changes: Dict[str, Any] = {}
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # a broken store only costs us some extra work
+            return {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def set(self, key: str, value: Any):
+        with self.lock:
+            self.data[key] = value
+            self.changes[key] = value
+
+    def delete(self, key: str):
+        with self.lock:
+            self.data.pop(key, None)
+            self.changes[key] = _DELETED
+
+    def save(self, force: bool = False):
+        """
+        Merges the changes into the file. Without changes, the file is only written if force is set.
+        """
+        with self.lock:
+            if not self.changes and not force:
+                return
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with FileLock(self.path + ".lock"):
+                data = self._load()
+                for key, value in self.changes.items():
+                    if value is _DELETED:
+                        data.pop(key, None)
+                    else:
+                        data[key] = value
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            self.data = data
+            self.changes = {}
+
+
+def _stat_key(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def static_fingerprint(static_inputs: Iterable[str]) -> str:
+    """
+    Fingerprint of our own code and the given static files.
+    """
+    return FingerprintLedger.fingerprint(
+        sorted(map(str, Path(__file__).parents[1].rglob("*.py"))) + list(static_inputs)
+    )
+
+
+class FingerprintLedger(JsonStore):
+    """
+    Remembers the inputs every generated file was built from, so generators can skip outputs whose inputs did not
+    change. Static inputs, like patch files, and the generator code itself are part of every fingerprint.
+    Entries that were not looked up, recorded or touched during a run are dropped when it saves.
+    """
+
+    def __init__(self, name: str, static_inputs: Iterable[str]):
+        super().__init__(os.path.join("fingerprints", name))
+        self.static_fingerprint = static_fingerprint(static_inputs)
+        self.touched: Set[str] = set()
+
+    @staticmethod
+    def fingerprint(inputs: Iterable[str], extra: str = "") -> str:
+        h = hashlib.sha256()
+        for path in inputs:
+            h.update(path.encode("utf-8"))
+            if os.path.isfile(path):
+                h.update(file_digests(path, ["sha256"])["sha256"].encode("utf-8"))
+            h.update(b"\0")
+        h.update(extra.encode("utf-8"))
+        return h.hexdigest()
+
+    def input_fingerprint(self, inputs: Iterable[str], extra: str = "") -> str:
+        return self.fingerprint(inputs, self.static_fingerprint + extra)
+
+    def fresh_entry(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the recorded entry if it was built from the same inputs and none of its outputs were touched since.
+        """
+        self.touched.add(key)
+        entry = self.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        for output, stat in entry["outputs"].items():
+            if _stat_key(os.path.join(launcher_path(), output)) != stat:
+                return None
+        return entry
+
+    def record(self, key: str, fingerprint: str, outputs: Iterable[str], **extra):
+        self.touched.add(key)
+        self.set(
+            key,
+            {
+                "fingerprint": fingerprint,
+                # relative to the launcher dir and stat'ed, so a reset or replaced launcher dir invalidates the entry
+                "outputs": {
+                    os.path.relpath(output, launcher_path()): _stat_key(output)
+                    for output in outputs
+                },
+                **extra,
+            },
+        )
+
+    def touch(self, key: str):
+        """
+        Keeps an entry that is still in use, but wasn't looked up through fresh_entry.
+        """
+        self.touched.add(key)
+
+    def save(self, force: bool = False):
+        for key in list(self.data):
+            if key not in self.touched:
+                self.delete(key)
+        super().save(force)
+        # fingerprints were computed from the digests stored there
+        save_file_digests()
+
+
+_file_digests: Optional[JsonStore] = None
+
+
+def file_digest_store() -> JsonStore:
+    global _file_digests
+    if _file_digests is None:
+        _file_digests = JsonStore("file_digests")
+    return _file_digests
+
+
+def save_file_digests():
+    if _file_digests is not None:
+        _file_digests.save()
+
+
+def _digest_key(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def record_file_digests(path: str, digests: Dict[str, str]):
+    """
+    Remembers digests computed elsewhere, e.g. while downloading the file.
+    """
+    file_digest_store().set(os.path.abspath(path), [_digest_key(path), digests])
+
+
+def file_digests(
+    path: str, algorithms: Iterable[str] = ("sha1", "sha256")
+) -> Dict[str, str]:
+    """
+    Hex digests of the file for each of the hashlib algorithms, reading the file only once.
+    Digests are cached by device, inode, size and modification time, so unchanged files are never hashed again.
+    """
+    key = os.path.abspath(path)
+    stat_key = _digest_key(path)
+    digests = {}
+    cached = file_digest_store().get(key)
+    if cached is not None and cached[0] == stat_key:
+        digests = dict(cached[1])
+
+    hashers = {
+        algorithm: hashlib.new(algorithm)
+        for algorithm in algorithms
+        if algorithm not in digests
+    }
+    if hashers:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                for hasher in hashers.values():
+                    hasher.update(block)
+        for algorithm, hasher in hashers.items():
+            digests[algorithm] = hasher.hexdigest()
+        file_digest_store().set(key, [stat_key, digests])
+    return {algorithm: digests[algorithm] for algorithm in algorithms}
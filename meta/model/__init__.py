@@ -1,21 +1,105 @@
 import copy
+import hashlib
+import json
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Iterator
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 
 import pydantic
-from pydantic import Field, validator  # type: ignore
+from pydantic import Field, validator, ValidationError  # type: ignore
+from pydantic.fields import (  # type: ignore
+    ModelField,
+    SHAPE_SINGLETON,
+    SHAPE_LIST,
+    SHAPE_DICT,
+    SHAPE_MAPPING,
+)
 
+from ..common import serialization
+from ..common.store import JsonStore
 from ..common import (
     LAUNCHER_MAVEN,
     serialize_datetime,
     replace_old_launchermeta_url,
     get_all_bases,
     merge_dict,
+    write_if_changed,
+    launcher_manifest_path,
 )
 
 META_FORMAT_VERSION = 1
 
+# Models written in this process, keyed by absolute path. Only enabled when running as a single pipeline, and only for
+# the directories later stages read, so they can pick up what earlier stages wrote without parsing it again. The
+# writer and all readers share one instance, so models read through parse_file must be copied before changing them.
+_model_cache: Optional[Dict[str, Tuple[Tuple[int, int], "MetaBase"]]] = None
+_model_cache_paths: List[str] = []
+
+
+def enable_model_cache(paths: Iterable[str]):
+    """
+    Enables the model cache for files at or below paths.
+    """
+    global _model_cache, _model_cache_paths
+    _model_cache = {}
+    _model_cache_paths = [os.path.abspath(path) for path in paths]
+
+
+def model_cache_enabled() -> bool:
+    return _model_cache is not None
+
+
+def remember_model(file_path: str, model: "MetaBase"):
+    """
+    Caches a model that was written to file_path, if a later stage reads that file.
+    """
+    if _model_cache is None:
+        return
+    path = os.path.abspath(file_path)
+    if any(
+        path == cached or path.startswith(cached + os.sep)
+        for cached in _model_cache_paths
+    ):
+        _model_cache[path] = (_file_key(path), model)
+
+
+def _cached_model(cls: type, path: str) -> Optional["MetaBase"]:
+    if _model_cache is None:
+        return None
+    path = os.path.abspath(path)
+    cached = _model_cache.get(path)
+    if cached is None or not isinstance(cached[1], cls):
+        return None
+    if cached[0] != _file_key(path):
+        return None
+    return cached[1]
+
+
+def _file_key(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# Files that passed full validation, keyed by absolute path. Files are trusted as long as they are not modified.
+_validation_stamps: Optional[JsonStore] = None
+
+
+def validation_stamps() -> JsonStore:
+    global _validation_stamps
+    if _validation_stamps is None:
+        _validation_stamps = JsonStore("validation_stamps")
+    return _validation_stamps
+
+
+def save_validation_stamps():
+    if _validation_stamps is not None:
+        _validation_stamps.save()
+
+
+# frozen specifiers by the string they were parsed from
+_interned_specifiers: Dict[str, "GradleSpecifier"] = {}
+
 
 class GradleSpecifier:
     """
@@ -23,8 +107,22 @@ class GradleSpecifier:
     "org.lwjgl.lwjgl:lwjgl:2.9.0"
     "net.java.jinput:jinput:2.0.5"
     "net.minecraft:launchwrapper:1.5"
+
+    Specifiers parsed with from_string are interned and frozen, as they are shared by every library using them.
+    Use copy.copy() or replace() to get a specifier that can be modified.
     """
 
+    __slots__ = (
+        "group",
+        "artifact",
+        "version",
+        "classifier",
+        "extension",
+        "_str",
+        "_hash",
+        "_frozen",
+    )
+
     def __init__(
         self,
         group: str,
@@ -35,18 +133,67 @@ class GradleSpecifier:
     ):
         if extension is None:
             extension = "jar"
+        object.__setattr__(self, "_frozen", False)
         self.group = group
         self.artifact = artifact
         self.version = version
         self.classifier = classifier
         self.extension = extension
 
+    def __setattr__(self, name: str, value: Any):
+        if self._frozen:
+            raise AttributeError(f"{self!r} is frozen, modify a copy of it instead")
+        object.__setattr__(self, name, value)
+        # the string form and hash are computed on demand
+        object.__setattr__(self, "_str", None)
+        object.__setattr__(self, "_hash", None)
+
+    def freeze(self) -> "GradleSpecifier":
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def replace(self, **changes: Optional[str]) -> "GradleSpecifier":
+        """
+        Returns a modifiable copy, with the given components changed.
+        """
+        components = {
+            "group": self.group,
+            "artifact": self.artifact,
+            "version": self.version,
+            "classifier": self.classifier,
+            "extension": self.extension,
+        }
+        components.update(changes)
+        return GradleSpecifier(**components)  # type: ignore
+
+    def __copy__(self) -> "GradleSpecifier":
+        return self.replace()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "GradleSpecifier":
+        # frozen specifiers can be shared, like other immutable values
+        if self._frozen:
+            return self
+        return self.replace()
+
+    def __reduce__(self):
+        if self._frozen:
+            return GradleSpecifier.from_string, (str(self),)
+        return GradleSpecifier, (
+            self.group,
+            self.artifact,
+            self.version,
+            self.classifier,
+            self.extension,
+        )
+
     def __str__(self):
+        if self._str is not None:
+            return self._str
         ext = ""
         if self.extension != "jar":
             ext = "@%s" % self.extension
         if self.classifier:
-            return "%s:%s:%s:%s%s" % (
+            result = "%s:%s:%s:%s%s" % (
                 self.group,
                 self.artifact,
                 self.version,
@@ -54,7 +201,9 @@ class GradleSpecifier:
                 ext,
             )
         else:
-            return "%s:%s:%s%s" % (self.group, self.artifact, self.version, ext)
+            result = "%s:%s:%s%s" % (self.group, self.artifact, self.version, ext)
+        object.__setattr__(self, "_str", result)
+        return result
 
     def filename(self):
         if self.classifier:
@@ -88,6 +237,8 @@ class GradleSpecifier:
         return self.group == "org.apache.logging.log4j"
 
     def __eq__(self, other: Any):
+        if self is other:
+            return True
         if isinstance(other, GradleSpecifier):
             return str(self) == str(other)
         else:
@@ -100,7 +251,9 @@ class GradleSpecifier:
         return str(self) > str(other)
 
     def __hash__(self):
-        return hash(str(self))
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(str(self)))
+        return self._hash
 
     @classmethod
     def __get_validators__(cls):
@@ -108,6 +261,10 @@ class GradleSpecifier:
 
     @classmethod
     def from_string(cls, v: str):
+        interned = _interned_specifiers.get(v)
+        if interned is not None:
+            return interned
+
         ext_split = v.split("@")
 
         components = ext_split[0].split(":")
@@ -122,7 +279,8 @@ class GradleSpecifier:
         classifier = None
         if len(components) == 4:
             classifier = components[3]
-        return cls(group, artifact, version, classifier, extension)
+        specifier = cls(group, artifact, version, classifier, extension).freeze()
+        return _interned_specifiers.setdefault(v, specifier)
 
     @classmethod
     def validate(cls, v: "str | GradleSpecifier"):
@@ -150,10 +308,95 @@ class MetaBase(pydantic.BaseModel):
             exclude_none=True, sort_keys=True, by_alias=True, indent=4, **kwargs
         )
 
-    def write(self, file_path: str):
+    def write(self, file_path: str) -> bool:
+        """
+        Writes the model to file_path, leaving the file untouched if its content would not change.
+        Returns whether the file was written.
+        """
         Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, "w") as f:
-            f.write(self.json())
+        data = self.json().encode("utf-8")
+        written = write_if_changed(file_path, data)
+        self.record_write(file_path, data)
+        return written
+
+    def record_write(self, file_path: str, data: bytes):
+        remember_model(file_path, self)
+
+    @classmethod
+    def parse_file(cls, path, **kwargs):
+        cached = _cached_model(cls, path)
+        if cached is not None:
+            return cached
+
+        return super(MetaBase, cls).parse_file(path, **kwargs)
+
+    @classmethod
+    def stamp_validated(cls, path: str):
+        """
+        Marks the file as valid for this model, so parse_file_trusted can skip validating it.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = validation_stamps().get(path)
+        models = [cls.__qualname__]
+        if stamp and stamp[:2] == [st.st_size, st.st_mtime_ns]:
+            if cls.__qualname__ in stamp[2]:
+                return
+            models += stamp[2]
+        validation_stamps().set(path, [st.st_size, st.st_mtime_ns, sorted(models)])
+
+    @classmethod
+    def is_stamped_valid(cls, path: str) -> bool:
+        path = os.path.abspath(path)
+        stamp = validation_stamps().get(path)
+        if stamp is None or cls.__qualname__ not in stamp[2]:
+            return False
+        st = os.stat(path)
+        return stamp[:2] == [st.st_size, st.st_mtime_ns]
+
+    @classmethod
+    def parse_file_trusted(cls, path: str):
+        """
+        Like parse_file, but skips validation for files that were validated before and haven't changed since.
+        """
+        cached = _cached_model(cls, path)
+        if cached is not None:
+            return cached
+        if cls.is_stamped_valid(path):
+            with open(path, "rb") as f:
+                return cls.construct_trusted(json.load(f))
+
+        model = cls.parse_file(path)
+        cls.stamp_validated(path)
+        return model
+
+    @classmethod
+    def construct_trusted(cls, data: Any):
+        """
+        Builds the model from already validated data. Nested models are constructed without validation, plain values
+        are used as they are and only fields with validators or special types are converted.
+        """
+        if cls.__custom_root_type__:
+            data = {"__root__": data}
+        values = {}
+        fields_set = set()
+        for name, alias, convert, field in _trusted_plan(cls):
+            if alias in data:
+                value = data[alias]
+            elif name in data:
+                value = data[name]
+            else:
+                values[name] = field.get_default()
+                continue
+            values[name] = None if value is None else convert(value)
+            fields_set.add(name)
+
+        # the same as construct() does, without handling arguments that we never pass
+        m = cls.__new__(cls)
+        object.__setattr__(m, "__dict__", values)
+        object.__setattr__(m, "__fields_set__", fields_set)
+        m._init_private_attributes()
+        return m
 
     def merge(self, other: "MetaBase"):
         """
@@ -193,6 +436,74 @@ class MetaBase(pydantic.BaseModel):
         allow_population_by_field_name = True
 
         json_encoders = {datetime: serialize_datetime, GradleSpecifier: str}
+        json_dumps = serialization.dumps
+
+
+# per model: (name, alias, converter, field) for every field, see construct_trusted
+_trusted_plans: Dict[type, List[Tuple[str, str, Any, ModelField]]] = {}
+
+
+def _trusted_plan(model: Any) -> List[Tuple[str, str, Any, ModelField]]:
+    plan = _trusted_plans.get(model)
+    if plan is None:
+        plan = [
+            (name, field.alias, _trusted_converter(field, model), field)
+            for name, field in model.__fields__.items()
+        ]
+        _trusted_plans[model] = plan
+    return plan
+
+
+def _trusted_converter(field: ModelField, model: Any):
+    def validate(value):
+        value, errors = field.validate(value, {}, loc=field.alias, cls=model)
+        if errors:
+            raise ValidationError([errors], model)
+        return value
+
+    if field.class_validators or field.pre_validators:
+        return validate
+
+    type_ = field.type_
+    shape = field.shape
+    plain_keys = shape in (SHAPE_DICT, SHAPE_MAPPING) and field.key_field.type_ in (
+        str,
+        Any,
+    )
+    if isinstance(type_, type) and issubclass(type_, MetaBase):
+        construct = type_.construct_trusted
+        if shape == SHAPE_SINGLETON:
+            if type_.__custom_root_type__:
+                return construct
+            return lambda v: construct(v) if type(v) is dict else validate(v)
+        if shape == SHAPE_LIST:
+            return lambda v: (
+                [construct(item) for item in v] if type(v) is list else validate(v)
+            )
+        if plain_keys:
+            return lambda v: (
+                {k: construct(item) for k, item in v.items()}
+                if type(v) is dict
+                else validate(v)
+            )
+    elif type_ in (str, int, bool) or type_ is Any:
+        if type_ is Any:
+            is_plain = lambda v: True
+        else:
+            is_plain = lambda v: type(v) is type_
+        if shape == SHAPE_SINGLETON:
+            return lambda v: v if is_plain(v) else validate(v)
+        if shape == SHAPE_LIST:
+            return lambda v: (
+                v if type(v) is list and all(map(is_plain, v)) else validate(v)
+            )
+        if plain_keys:
+            return lambda v: (
+                v if type(v) is dict and all(map(is_plain, v.values())) else validate(v)
+            )
+    elif type_ is GradleSpecifier and shape == SHAPE_SINGLETON:
+        return GradleSpecifier.validate
+    return validate
 
 
 class Versioned(MetaBase):
@@ -346,6 +657,61 @@ class MetaVersion(Versioned):
     additional_jvm_args: Optional[List[str]] = Field(alias="+jvmArgs")
     logging: Optional[MojangLogging]
 
+    def record_write(self, file_path: str, data: bytes):
+        super().record_write(file_path, data)
+
+        # remember what index.py needs to know about this file, so it doesn't have to read it again
+        write_version_manifest(file_path, hashlib.sha256(data).hexdigest(), self)
+
+
+# fields of a version that are copied into the version index of its package
+VERSION_INDEX_FIELDS = {
+    "version",
+    "type",
+    "release_time",
+    "requires",
+    "conflicts",
+    "volatile",
+}
+
+
+def write_version_manifest(
+    file_path: str, sha256: str, v: MetaVersion
+) -> Optional[Dict[str, Any]]:
+    manifest_path = launcher_manifest_path(file_path)
+    if manifest_path is None:
+        return None
+    st = os.stat(file_path)
+    manifest = {
+        "sha256": sha256,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "index": json.loads(v.json(include=VERSION_INDEX_FIELDS)),
+    }
+    Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(
+        manifest_path, json.dumps(manifest, sort_keys=True).encode("utf-8")
+    )
+    return manifest
+
+
+def read_version_manifest(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the manifest recorded when the version file was written, if the file was not changed since.
+    """
+    manifest_path = launcher_manifest_path(file_path)
+    if manifest_path is None:
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        st = os.stat(file_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest["size"] != st.st_size or manifest["mtime_ns"] != st.st_mtime_ns:
+        return None
+    return manifest
+
 
 class MetaPackage(Versioned):
     name: str
@@ -97,6 +97,89 @@ class JavaRuntimeVersion(MetaVersion):
     runtimes: list[JavaRuntimeMeta]
 
 
+class JavaRuntimeResolution(MetaVersion):
+    # runtime OS -> Java component uid -> runtime
+    runtimes: dict[JavaRuntimeOS, dict[str, JavaRuntimeMeta]]
+
+
+class JavaRuntimeCatalogue:
+    """
+    Runtimes by major version in the order they were added, also indexed by (vendor, major, runtime OS, package type).
+    Index entries are sorted newest version first when they are first looked up after a change.
+    """
+
+    def __init__(self):
+        self.majors: dict[int, list[JavaRuntimeMeta]] = {}
+        # every runtime is kept with the order it was added in, to break ties between equal versions
+        self.index: dict[
+            tuple[str, int, JavaRuntimeOS, JavaPackageType],
+            list[tuple[int, JavaRuntimeMeta]],
+        ] = {}
+        self.vendors: dict[tuple[int, JavaRuntimeOS, JavaPackageType], list[str]] = {}
+        self.unsorted: set[tuple[str, int, JavaRuntimeOS, JavaPackageType]] = set()
+        self.count = 0
+        self.best_cache: dict[Any, Optional[JavaRuntimeMeta]] = {}
+
+    def __contains__(self, major: int) -> bool:
+        return major in self.majors
+
+    def add(self, runtime: JavaRuntimeMeta, major: int):
+        self.majors.setdefault(major, []).append(runtime)
+        key = (runtime.vendor, major, runtime.runtime_os, runtime.package_type)
+        if key not in self.index:
+            self.index[key] = []
+            self.vendors.setdefault(key[1:], []).append(runtime.vendor)
+        self.index[key].append((self.count, runtime))
+        self.unsorted.add(key)
+        self.count += 1
+        self.best_cache.clear()
+
+    def _entries(self, key) -> list[tuple[int, JavaRuntimeMeta]]:
+        entries = self.index.get(key, [])
+        if key in self.unsorted:
+            # stable, so equal versions stay in the order they were added
+            entries.sort(key=lambda entry: entry[1].version, reverse=True)
+            self.unsorted.discard(key)
+        return entries
+
+    def runtimes(
+        self,
+        vendor: str,
+        major: int,
+        runtime_os: JavaRuntimeOS,
+        package_type: JavaPackageType = JavaPackageType.Jre,
+    ) -> list[JavaRuntimeMeta]:
+        """
+        The runtimes of a vendor, newest version first.
+        """
+        entries = self._entries((vendor, major, runtime_os, package_type))
+        return [runtime for _, runtime in entries]
+
+    def best(
+        self,
+        major: int,
+        runtime_os: JavaRuntimeOS,
+        package_type: JavaPackageType = JavaPackageType.Jre,
+        avoid_vendors: tuple[str, ...] = (),
+    ) -> Optional[JavaRuntimeMeta]:
+        """
+        The newest runtime for the OS and major version, or the first added one of the newest.
+        Vendors in avoid_vendors are only used if no other vendor has a runtime.
+        """
+        key = (major, runtime_os, package_type, avoid_vendors)
+        if key not in self.best_cache:
+            vendors = self.vendors.get((major, runtime_os, package_type), [])
+            preferred = [vendor for vendor in vendors if vendor not in avoid_vendors]
+            heads = [
+                self._entries((vendor, major, runtime_os, package_type))[0]
+                for vendor in preferred or vendors
+            ]
+            heads.sort(key=lambda entry: entry[0])
+            heads.sort(key=lambda entry: entry[1].version, reverse=True)
+            self.best_cache[key] = heads[0][1] if heads else None
+        return self.best_cache[key]
+
+
 class URLComponents(NamedTuple):
     scheme: str
     netloc: str
@@ -206,6 +289,8 @@ ADOPTX_API_FEATURE_RELEASES = (
 )
 # ?image_type={{image_type}}&heap_size={{heap_size}}&project={{project}}&vendor={{vendor}}&page_size={{page_size}}&page={{page}}&sort_method={{sort_method}}&sort_order={{sort_order}}
 ADOPTX_API_AVAILABLE_RELEASES = f"{{base_url}}/v3/info/available_releases"
+# the largest page_size the feature releases endpoint accepts
+ADOPTX_API_MAX_PAGE_SIZE = 20
 
 
 class AdoptxAPIFeatureReleasesQuery(APIQuery):
@@ -574,6 +659,22 @@ class ZuluPackageList(MetaBase):
         self.__root__.append(pkg)
 
 
+class ZuluPackageDetailIndex(MetaBase):
+    __root__: dict[str, ZuluPackageDetail]
+
+    def __iter__(self) -> Generator[tuple[str, ZuluPackageDetail], None, None]:
+        yield from self.__root__.items()
+
+    def __getitem__(self, item: str) -> ZuluPackageDetail:
+        return self.__root__[item]
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.__root__
+
+    def add(self, pkg: ZuluPackageDetail):
+        self.__root__[pkg.package_uuid] = pkg
+
+
 class ZuluPackagesDetail(MetaBase):
     __root__: list[ZuluPackageDetail]
 
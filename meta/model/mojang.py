@@ -1,5 +1,8 @@
+import copy
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Iterator
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from .enum import StrEnum
 
 from pydantic import validator, Field
@@ -169,6 +172,74 @@ class LibraryPatches(MetaBase):
         return self.__root__[item]
 
 
+class LibraryPatchesWrap:
+    def __init__(self, patches: LibraryPatches):
+        self.patches: List[LibraryPatch] = list(patches)
+        # positions of the patches matching each name, in ascending order
+        self.positions: Dict[GradleSpecifier, List[int]] = defaultdict(list)
+        for position, patch in enumerate(self.patches):
+            for name in dict.fromkeys(patch.match):
+                self.positions[name].append(position)
+        self.expansions: Dict[GradleSpecifier, Tuple[List[Library], List[Library]]] = {}
+
+    def applicable(self, target: Library) -> Iterator[LibraryPatch]:
+        """
+        Yields the patches that apply to target, in order. Overrides may rename the target while iterating, later
+        patches are matched against the new name.
+        """
+        position = -1
+        while True:
+            positions = self.positions.get(target.name)
+            if not positions:
+                return
+            i = bisect_right(positions, position)
+            if i == len(positions):
+                return
+            position = positions[i]
+            yield self.patches[position]
+
+    def expand(self, name: GradleSpecifier) -> Tuple[List[Library], List[Library]]:
+        """
+        Returns the overrides to merge into a library with this name, in order, and the additional libraries the
+        patches add for it. The additional libraries are shared between all libraries with the same name, so they
+        must not be modified.
+        """
+        expansion = self.expansions.get(name)
+        if expansion is not None:
+            return expansion
+
+        overrides = []
+        new_libraries = []
+        to_patch = []
+
+        def add_libraries(patch: LibraryPatch):
+            if patch.additionalLibraries:
+                additional_copy = copy.deepcopy(patch.additionalLibraries)
+                new_libraries.extend(dict.fromkeys(additional_copy))
+                if patch.patchAdditionalLibraries:
+                    to_patch.extend(additional_copy)
+
+        # only follow renames here, the overrides are merged into the actual library
+        probe = Library(name=name)
+        for patch in self.applicable(probe):
+            if patch.override:
+                overrides.append(patch.override)
+                if patch.override.name is not None:
+                    probe.name = patch.override.name
+            add_libraries(patch)
+
+        while to_patch:
+            target = to_patch.pop(0)
+            for patch in self.applicable(target):
+                if patch.override:
+                    target.merge(patch.override)
+                add_libraries(patch)
+
+        expansion = (overrides, new_libraries)
+        self.expansions[name] = expansion
+        return expansion
+
+
 class LegacyServices(MetaBase):
     __root__: List[str]
 
@@ -0,0 +1,30 @@
+"""
+Show how well the HTTP cache works and how much space it takes
+"""
+
+import os
+
+from meta.common import cache_path
+from meta.common.http_cache import BoundedFileCache, MIB
+
+
+def main():
+    stats = BoundedFileCache(os.path.join(cache_path(), "http_cache")).stats()
+
+    requests = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / requests if requests else 0
+    print(
+        f"Small responses: {stats['entries'] - stats['large_entries']} entries, "
+        f"{stats['bytes'] / MIB:.1f} of {stats['budget'] / MIB:.0f} MiB"
+    )
+    print(
+        f"Large responses: {stats['large_entries']} entries, "
+        f"{stats['large_bytes'] / MIB:.1f} of {stats['large_budget'] / MIB:.0f} MiB"
+    )
+    print(
+        f"Hit rate: {hit_rate:.1%} of {requests} lookups over the last {stats['runs']} runs"
+    )
+
+
+if __name__ == "__main__":
+    main()
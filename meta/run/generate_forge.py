@@ -1,3 +1,4 @@
+import copy
 import os
 import re
 from packaging import version as pversion
@@ -16,6 +17,7 @@ from meta.common.forge import (
     FORGEWRAPPER_LIBRARY,
 )
 from meta.common.mojang import MINECRAFT_COMPONENT
+from meta.common.store import FingerprintLedger
 from meta.model import (
     MetaVersion,
     Dependency,
@@ -24,6 +26,7 @@ from meta.model import (
     MojangLibraryDownloads,
     MojangArtifact,
     MetaPackage,
+    save_validation_stamps,
 )
 from meta.model.forge import (
     ForgeVersion,
@@ -116,7 +119,7 @@ def version_from_profile(
         ):
             continue
 
-        overridden_name = forge_lib.name
+        overridden_name = copy.copy(forge_lib.name)
         if overridden_name.group == "net.minecraftforge":
             if overridden_name.artifact == "minecraftforge":
                 overridden_name.artifact = "forge"
@@ -177,7 +180,7 @@ def version_from_modernized_installer(
 
         if forge_lib.name.group == "net.minecraftforge":
             if forge_lib.name.artifact == "forge":
-                overridden_name = forge_lib.name
+                overridden_name = copy.copy(forge_lib.name)
                 overridden_name.classifier = "universal"
                 forge_lib.downloads.artifact.path = overridden_name.path()
                 forge_lib.downloads.artifact.url = (
@@ -186,7 +189,7 @@ def version_from_modernized_installer(
                 forge_lib.name = overridden_name
 
             elif forge_lib.name.artifact == "minecraftforge":
-                overridden_name = forge_lib.name
+                overridden_name = copy.copy(forge_lib.name)
                 overridden_name.artifact = "forge"
                 overridden_name.classifier = "universal"
                 overridden_name.version = "%s-%s" % (
@@ -245,7 +248,7 @@ def version_from_build_system_installer(
     v.maven_files = []
 
     # load the locally cached installer file info and use it to add the installer entry in the json
-    info = InstallerInfo.parse_file(
+    info = InstallerInfo.parse_file_trusted(
         os.path.join(UPSTREAM_DIR, INSTALLER_INFO_DIR, f"{version.long_version}.json")
     )
     installer_lib = Library(
@@ -285,7 +288,7 @@ def version_from_build_system_installer(
 
         if forge_lib.name.group == "net.minecraftforge":
             if forge_lib.name.artifact == "forge" and not forge_lib.name.classifier:
-                forge_lib.name.classifier = "launcher"
+                forge_lib.name = forge_lib.name.replace(classifier="launcher")
                 forge_lib.downloads.artifact.path = forge_lib.name.path()
                 forge_lib.downloads.artifact.url = (
                     "https://maven.minecraftforge.net/%s" % forge_lib.name.path()
@@ -361,6 +364,10 @@ def main():
         "1.12.1",
         "1.12.2",
     ]
+    ledger = FingerprintLedger(
+        "generate_forge",
+        [os.path.join(UPSTREAM_DIR, LEGACYINFO_FILE)],
+    )
 
     for key, entry in remote_versions.versions.items():
         if entry.mc_version is None:
@@ -415,14 +422,33 @@ def main():
         profile_filepath = os.path.join(
             UPSTREAM_DIR, INSTALLER_MANIFEST_DIR, f"{version.long_version}.json"
         )
+        out_filepath = os.path.join(
+            LAUNCHER_DIR, FORGE_COMPONENT, f"{version.rawVersion}.json"
+        )
+
+        fingerprint = ledger.input_fingerprint(
+            [
+                installer_version_filepath,
+                profile_filepath,
+                os.path.join(
+                    UPSTREAM_DIR, INSTALLER_INFO_DIR, f"{version.long_version}.json"
+                ),
+                os.path.join(
+                    LAUNCHER_DIR, MINECRAFT_COMPONENT, f"{version.mc_version_sane}.json"
+                ),
+            ],
+            entry.json(),
+        )
+        if ledger.fresh_entry(version.long_version, fingerprint):
+            continue
 
         eprint(installer_version_filepath)
         if os.path.isfile(installer_version_filepath):
-            installer = MojangVersion.parse_file(installer_version_filepath)
+            installer = MojangVersion.parse_file_trusted(installer_version_filepath)
             if entry.mc_version in legacy_versions:
                 v = version_from_modernized_installer(installer, version)
             else:
-                profile = ForgeInstallerProfileV2.parse_file(profile_filepath)
+                profile = ForgeInstallerProfileV2.parse_file_trusted(profile_filepath)
                 v = version_from_build_system_installer(installer, profile, version)
         else:
             if version.uses_installer():
@@ -430,7 +456,7 @@ def main():
                 if not os.path.isfile(profile_filepath):
                     eprint("Skipping %s with missing profile json" % key)
                     continue
-                profile = ForgeInstallerProfile.parse_file(profile_filepath)
+                profile = ForgeInstallerProfile.parse_file_trusted(profile_filepath)
                 v = version_from_profile(profile, version)
             else:
                 # Generate json for legacy here
@@ -448,19 +474,23 @@ def main():
 
                 v = version_from_legacy(legacy_info_list.number[str(build)], version)
 
-        v.write(os.path.join(LAUNCHER_DIR, FORGE_COMPONENT, f"{v.version}.json"))
+        v.write(out_filepath)
+        ledger.record(version.long_version, fingerprint, [out_filepath])
 
-        recommended_versions.sort()
+    recommended_versions.sort()
 
-        print("Recommended versions:", recommended_versions)
+    print("Recommended versions:", recommended_versions)
 
-        package = MetaPackage(
-            uid=FORGE_COMPONENT,
-            name="Forge",
-            project_url="https://www.minecraftforge.net/forum/",
-        )
-        package.recommended = recommended_versions
-        package.write(os.path.join(LAUNCHER_DIR, FORGE_COMPONENT, "package.json"))
+    package = MetaPackage(
+        uid=FORGE_COMPONENT,
+        name="Forge",
+        project_url="https://www.minecraftforge.net/forum/",
+    )
+    package.recommended = recommended_versions
+    package.write(os.path.join(LAUNCHER_DIR, FORGE_COMPONENT, "package.json"))
+
+    ledger.save()
+    save_validation_stamps()
 
 
 if __name__ == "__main__":
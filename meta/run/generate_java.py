@@ -4,25 +4,33 @@ import os
 from typing import Optional
 from functools import reduce
 
-from meta.common import ensure_component_dir, launcher_path, upstream_path
+from meta.common import (
+    ensure_component_dir,
+    launcher_path,
+    remove_files,
+    upstream_path,
+)
 
 from meta.common.java import (
     JAVA_MINECRAFT_COMPONENT,
     JAVA_ADOPTIUM_COMPONENT,
     JAVA_OPENJ9_COMPONENT,
     JAVA_AZUL_COMPONENT,
+    JAVA_RESOLUTION_COMPONENT,
     ADOPTIUM_DIR,
     ADOPTIUM_VERSIONS_DIR,
     OPENJ9_DIR,
     OPENJ9_VERSIONS_DIR,
     AZUL_DIR,
-    AZUL_VERSIONS_DIR,
+    AZUL_DETAILS_FILE,
 )
-from meta.model import MetaPackage
+from meta.model import Dependency, MetaPackage, MetaVersion, save_validation_stamps
 from meta.model.java import (
     JavaRuntimeOS,
     JavaRuntimeVersion,
     JavaRuntimeMeta,
+    JavaRuntimeCatalogue,
+    JavaRuntimeResolution,
     JavaVersionMeta,
     JavaPackageType,
     JavaChecksumMeta,
@@ -35,12 +43,14 @@ from meta.model.java import (
     AdoptxBinary,
     ZuluPackageList,
     ZuluPackageDetail,
+    ZuluPackageDetailIndex,
     AzulJavaPackageType,
     AzulArch,
 )
 
 from meta.common.mojang import (
     JAVA_MANIFEST_FILE,
+    MINECRAFT_COMPONENT,
 )
 
 from meta.model.mojang import (
@@ -279,6 +289,20 @@ def azul_package_to_java_runtime(
     )
 
 
+# constructs the missing mojang javas based on adoptium or azul (do not consider openj9 since it is for more niche cases)
+def get_mojang_extra_java(
+    extra_mojang_javas: JavaRuntimeCatalogue,
+    mojang_component: MojangJavaComponent,
+    java_os: JavaRuntimeOS,
+) -> JavaRuntimeMeta | None:
+    java_major = mojang_component_to_major(mojang_component)
+    runtime = extra_mojang_javas.best(java_major, java_os, avoid_vendors=("azul",))
+    if runtime is None:
+        return None
+    # the runtime is shared with its vendor's component and other Mojang components
+    return runtime.copy(update={"name": mojang_component})
+
+
 def writeJavas(javas: dict[int, list[JavaRuntimeMeta]], uid: str):
     def oldest_timestamp(a: datetime.datetime | None, b: datetime.datetime):
         if a is None or a > b:
@@ -317,15 +341,91 @@ def writeJavas(javas: dict[int, list[JavaRuntimeMeta]], uid: str):
     package.write(os.path.join(LAUNCHER_DIR, uid, "package.json"))
 
 
+def writeResolutions(catalogues: dict[str, JavaRuntimeCatalogue]):
+    ensure_component_dir(JAVA_RESOLUTION_COMPONENT)
+
+    # Minecraft versions name the Mojang runtime they want, newest one wins
+    mojang_named: dict[tuple[str, JavaRuntimeOS], JavaRuntimeMeta] = {}
+    for runtimes in catalogues[JAVA_MINECRAFT_COMPONENT].majors.values():
+        for runtime in runtimes:
+            key = (runtime.name, runtime.runtime_os)
+            if key not in mojang_named or mojang_named[key].version < runtime.version:
+                mojang_named[key] = runtime
+
+    minecraft_dir = os.path.join(LAUNCHER_DIR, MINECRAFT_COMPONENT)
+    filenames = (
+        sorted(os.listdir(minecraft_dir)) if os.path.isdir(minecraft_dir) else []
+    )
+    versions = [
+        filename
+        for filename in filenames
+        if filename.endswith(".json") and filename not in ["package.json", "index.json"]
+    ]
+
+    # drop tables of Minecraft versions that are gone
+    resolution_dir = os.path.join(LAUNCHER_DIR, JAVA_RESOLUTION_COMPONENT)
+    remove_files(
+        [
+            os.path.join(resolution_dir, filename)
+            for filename in os.listdir(resolution_dir)
+            if filename.endswith(".json")
+            and filename not in ["package.json", "index.json"]
+            and filename not in versions
+        ]
+    )
+
+    for filename in versions:
+        minecraft = MetaVersion.parse_file_trusted(
+            os.path.join(minecraft_dir, filename)
+        )
+
+        runtimes: dict[JavaRuntimeOS, dict[str, JavaRuntimeMeta]] = {}
+        for java_os in JavaRuntimeOS:
+            resolved: dict[str, JavaRuntimeMeta] = {}
+            for uid, catalogue in catalogues.items():
+                runtime = None
+                if (
+                    uid == JAVA_MINECRAFT_COMPONENT
+                    and minecraft.compatible_java_name is not None
+                ):
+                    runtime = mojang_named.get(
+                        (minecraft.compatible_java_name, java_os)
+                    )
+                else:
+                    for major in minecraft.compatible_java_majors or []:
+                        runtime = catalogue.best(major, java_os)
+                        if runtime is not None:
+                            break
+                if runtime is not None:
+                    resolved[uid] = runtime
+            if resolved:
+                runtimes[java_os] = resolved
+
+        resolution = JavaRuntimeResolution(
+            name="Minecraft Java Runtimes",
+            uid=JAVA_RESOLUTION_COMPONENT,
+            version=minecraft.version,
+            type=minecraft.type,
+            releaseTime=minecraft.release_time,
+            requires=[Dependency(uid=MINECRAFT_COMPONENT, equals=minecraft.version)],
+            runtimes=runtimes,
+        )
+        resolution.write(os.path.join(resolution_dir, filename))
+
+    package = MetaPackage(
+        uid=JAVA_RESOLUTION_COMPONENT, name="Minecraft Java Runtimes", recommended=[]
+    )
+    package.write(os.path.join(resolution_dir, "package.json"))
+
+
 def main():
-    javas: dict[int, list[JavaRuntimeMeta]] = {}
-    extra_mojang_javas: dict[int, list[JavaRuntimeMeta]] = {}
+    javas = JavaRuntimeCatalogue()
+    extra_mojang_javas = JavaRuntimeCatalogue()
+    catalogues: dict[str, JavaRuntimeCatalogue] = {}
 
     def add_java_runtime(runtime: JavaRuntimeMeta, major: int):
-        if major not in javas:
-            javas[major] = list[JavaRuntimeMeta]()
         print(f"Registering runtime: {runtime.name} for Java {major}")
-        javas[major].append(runtime)
+        javas.add(runtime, major)
 
         # only add specific versions to the list
         if (
@@ -349,9 +449,7 @@ def main():
                 and major in [17, 21, 25]
             )
         ):
-            if major not in extra_mojang_javas:
-                extra_mojang_javas[major] = list[JavaRuntimeMeta]()
-            extra_mojang_javas[major].append(runtime)
+            extra_mojang_javas.add(runtime, major)
 
     print("Processing Adoptium Releases")
     adoptium_path = os.path.join(UPSTREAM_DIR, ADOPTIUM_DIR, "available_releases.json")
@@ -379,8 +477,9 @@ def main():
                         rls, binary, java_os
                     )
                     add_java_runtime(runtime, major)
-    writeJavas(javas=javas, uid=JAVA_ADOPTIUM_COMPONENT)
-    javas = {}
+    writeJavas(javas=javas.majors, uid=JAVA_ADOPTIUM_COMPONENT)
+    catalogues[JAVA_ADOPTIUM_COMPONENT] = javas
+    javas = JavaRuntimeCatalogue()
 
     print("Processing OpenJ9 Releases")
     openj9_path = os.path.join(UPSTREAM_DIR, OPENJ9_DIR, "available_releases.json")
@@ -411,19 +510,19 @@ def main():
                         rls, binary, java_os
                     )
                     add_java_runtime(runtime, major)
-    writeJavas(javas=javas, uid=JAVA_OPENJ9_COMPONENT)
-    javas = {}
+    writeJavas(javas=javas.majors, uid=JAVA_OPENJ9_COMPONENT)
+    catalogues[JAVA_OPENJ9_COMPONENT] = javas
+    javas = JavaRuntimeCatalogue()
 
     print("Processing Azul Packages")
     azul_path = os.path.join(UPSTREAM_DIR, AZUL_DIR, "packages.json")
     if os.path.exists(azul_path):
         azul_packages = ZuluPackageList.parse_file(azul_path)
+        azul_details = ZuluPackageDetailIndex.parse_file_trusted(
+            os.path.join(UPSTREAM_DIR, AZUL_DETAILS_FILE)
+        )
         for _, pkg in azul_packages:
-            pkg_detail = ZuluPackageDetail.parse_file(
-                os.path.join(
-                    UPSTREAM_DIR, AZUL_VERSIONS_DIR, f"{pkg.package_uuid}.json"
-                )
-            )
+            pkg_detail = azul_details[pkg.package_uuid]
             major = pkg_detail.java_version[0]
             if major < 8 or pkg_detail.java_package_type is not AzulJavaPackageType.Jre:
                 continue  # we will never need java versions less than 8
@@ -444,28 +543,9 @@ def main():
             java_os = JavaRuntimeOS(f"{pkg_os}-{pkg_arch}")
             runtime = azul_package_to_java_runtime(pkg_detail, java_os)
             add_java_runtime(runtime, major)
-    writeJavas(javas=javas, uid=JAVA_AZUL_COMPONENT)
-    javas = {}
-
-    # constructs the missing mojang javas based on adoptium or azul (do not consider openj9 since it is for more niche cases)
-    def get_mojang_extra_java(
-        mojang_component: MojangJavaComponent, java_os: JavaRuntimeOS
-    ) -> JavaRuntimeMeta | None:
-        java_major = mojang_component_to_major(mojang_component)
-        if not java_major in extra_mojang_javas:
-            return None
-        posible_javas = list(
-            filter(lambda x: x.runtime_os == java_os, extra_mojang_javas[java_major])
-        )
-        if len(posible_javas) == 0:
-            return None
-        prefered_vendor = list(filter(lambda x: x.vendor != "azul", posible_javas))
-        if len(prefered_vendor) == 0:
-            prefered_vendor = posible_javas
-        prefered_vendor.sort(key=lambda x: x.version, reverse=True)
-        runtime = prefered_vendor[0]
-        runtime.name = mojang_component
-        return runtime
+    writeJavas(javas=javas.majors, uid=JAVA_AZUL_COMPONENT)
+    catalogues[JAVA_AZUL_COMPONENT] = javas
+    javas = JavaRuntimeCatalogue()
 
     print("Processing Mojang Javas")
     mojang_java_manifest = JavaIndex.parse_file(
@@ -492,14 +572,16 @@ def main():
                     elif (
                         comp == MojangJavaComponent.JreLegacy
                     ):  # arm version of win and mac is missing the legacy java
-                        runtime = get_mojang_extra_java(comp, java_os)
+                        runtime = get_mojang_extra_java(
+                            extra_mojang_javas, comp, java_os
+                        )
                         if runtime != None:
                             add_java_runtime(runtime, mojang_component_to_major(comp))
                 if (
                     mojang_os_name == MojangJavaOsName.Linuxi386
                     and comp != MojangJavaComponent.JreLegacy
                 ):  # the linux x86 is missing all but legacy
-                    runtime = get_mojang_extra_java(comp, java_os)
+                    runtime = get_mojang_extra_java(extra_mojang_javas, comp, java_os)
                     if runtime != None:
                         add_java_runtime(runtime, mojang_component_to_major(comp))
             for mojang_runtime in mojang_runtimes:
@@ -525,12 +607,18 @@ def main():
             MojangJavaComponent.Delta,
             MojangJavaComponent.Epsilon,
         ]:
-            runtime = get_mojang_extra_java(comp, java_os)
+            runtime = get_mojang_extra_java(extra_mojang_javas, comp, java_os)
             if runtime != None:
                 add_java_runtime(runtime, mojang_component_to_major(comp))
 
-    writeJavas(javas=javas, uid=JAVA_MINECRAFT_COMPONENT)
-    javas = {}
+    writeJavas(javas=javas.majors, uid=JAVA_MINECRAFT_COMPONENT)
+    catalogues[JAVA_MINECRAFT_COMPONENT] = javas
+    javas = JavaRuntimeCatalogue()
+
+    print("Resolving Java runtimes for Minecraft versions")
+    writeResolutions(catalogues)
+
+    save_validation_stamps()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,25 @@
 import copy
 import hashlib
+import json
+import multiprocessing
 import re
 import os
 from collections import defaultdict, namedtuple
-from operator import attrgetter
+from datetime import datetime
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pprint import pprint
 from packaging import version as pversion
-from typing import Optional, List
+from typing import Optional, List, NamedTuple, Tuple
 
-from meta.common import ensure_component_dir, launcher_path, upstream_path
+from meta.common import (
+    ensure_component_dir,
+    launcher_path,
+    upstream_path,
+    serialize_datetime,
+)
+from meta.common.store import FingerprintLedger, file_digest_store, save_file_digests
 from meta.common.mojang import (
     STATIC_LEGACY_SERVICES_FILE,
     VERSION_MANIFEST_FILE,
@@ -20,6 +31,7 @@ from meta.common.mojang import (
     LIBRARY_PATCHES_FILE,
 )
 from meta.model import (
+    MetaBase,
     MetaVersion,
     Library,
     GradleSpecifier,
@@ -28,6 +40,10 @@ from meta.model import (
     Dependency,
     MetaPackage,
     MojangRules,
+    model_cache_enabled,
+    remember_model,
+    save_validation_stamps,
+    validation_stamps,
 )
 from meta.model.mojang import (
     LegacyServices,
@@ -36,6 +52,7 @@ from meta.model.mojang import (
     MojangVersion,
     LegacyOverrideIndex,
     LibraryPatches,
+    LibraryPatchesWrap,
     SUPPORTED_FEATURES,
 )
 
@@ -146,10 +163,79 @@ def add_or_get_bucket(buckets, rules: Optional[MojangRules]) -> MetaVersion:
     return bucket
 
 
+def freeze_value(value, exclude=()):
+    """
+    Hashable structure of a model or value, holding everything its JSON representation depends on.
+    """
+    if isinstance(value, MetaBase):
+        if value.__custom_root_type__:
+            return freeze_value(value.__root__)
+        fields = value.__fields__
+        items = [
+            (fields[key].alias, freeze_value(item))
+            for key, item in value.__dict__.items()
+            if item is not None and key not in exclude
+        ]
+        items.sort(key=itemgetter(0))
+        return dict, tuple(items)
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bool, float)):
+        # True == 1 and 1.0 == 1, but they are serialized differently
+        return type(value), value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, dict):
+        return dict, tuple(
+            sorted((key, freeze_value(item)) for key, item in value.items())
+        )
+    if isinstance(value, (list, tuple)):
+        return list, tuple(freeze_value(item) for item in value)
+    if isinstance(value, GradleSpecifier):
+        return str(value)
+    if isinstance(value, datetime):
+        return serialize_datetime(value)
+    raise TypeError(f"Cannot freeze {type(value).__name__}")
+
+
+def render_frozen(value, level: int = 0) -> str:
+    """
+    Renders a frozen value exactly like MetaBase.json() renders the value it came from.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, int):
+        return int.__repr__(value)
+    kind, items = value
+    if kind is bool:
+        return "true" if items else "false"
+    if kind is float:
+        return json.dumps(items)
+    if not items:
+        return "{}" if kind is dict else "[]"
+    indent = "\n" + "    " * (level + 1)
+    if kind is dict:
+        body = (
+            json.dumps(key) + ": " + render_frozen(item, level + 1)
+            for key, item in items
+        )
+        start, end = "{", "}"
+    else:
+        body = (render_frozen(item, level + 1) for item in items)
+        start, end = "[", "]"
+    return start + indent + ("," + indent).join(body) + "\n" + "    " * level + end
+
+
+@lru_cache(maxsize=None)
+def hash_frozen(frozen) -> str:
+    return hashlib.sha1(render_frozen(frozen).encode("utf-8", "strict")).hexdigest()
+
+
 def hash_lwjgl_version(lwjgl: MetaVersion):
-    lwjgl_copy = copy.deepcopy(lwjgl)
-    lwjgl_copy.release_time = None
-    return hashlib.sha1(lwjgl_copy.json().encode("utf-8", "strict")).hexdigest()
+    # many Minecraft versions share the same LWJGL libraries, those are only rendered and hashed once
+    return hash_frozen(freeze_value(lwjgl, exclude={"release_time"}))
 
 
 def sort_libs_by_name(library):
@@ -161,23 +247,46 @@ LWJGLEntry = namedtuple("LWJGLEntry", ("version", "sha1"))
 lwjglVersionVariants = defaultdict(list)
 
 
-def add_lwjgl_version(variants, lwjgl):
-    lwjgl_copy = copy.deepcopy(lwjgl)
-    libraries = list(lwjgl_copy.libraries)
-    libraries.sort(key=sort_libs_by_name)
-    lwjgl_copy.libraries = libraries
-
-    version = lwjgl_copy.version
-    current_hash = hash_lwjgl_version(lwjgl_copy)
-    found = False
+def has_lwjgl_variant(variants, version, sha1) -> bool:
     for variant in variants[version]:
-        existing_hash = variant.sha1
-        if current_hash == existing_hash:
-            found = True
-            break
-    if not found:
+        if variant.sha1 == sha1:
+            return True
+    return False
+
+
+def prepare_lwjgl_version(lwjgl: MetaVersion) -> Tuple[MetaVersion, str]:
+    lwjgl.libraries = sorted(lwjgl.libraries, key=sort_libs_by_name)
+    return lwjgl, hash_lwjgl_version(lwjgl)
+
+
+def add_lwjgl_version(variants, lwjgl, sha1, ledger: FingerprintLedger):
+    version = lwjgl.version
+    if not has_lwjgl_variant(variants, version, sha1):
         print("!!! New variant for LWJGL version %s" % version)
-        variants[version].append(LWJGLEntry(version=lwjgl_copy, sha1=current_hash))
+        variants[version].append(LWJGLEntry(version=lwjgl, sha1=sha1))
+        # keep the variant around for runs that skip the versions it came from
+        ledger_key = f"lwjgl:{sha1}"
+        ledger.touch(ledger_key)
+        if ledger_key not in ledger:
+            ledger.set(ledger_key, lwjgl.json(exclude={"release_time"}))
+
+
+def restore_lwjgl_version(variants, ledger: FingerprintLedger, candidate) -> bool:
+    """
+    Adds a variant kept in the ledger. Returns False if the ledger doesn't have it.
+    """
+    version, sha1, release_time = candidate
+    ledger_key = f"lwjgl:{sha1}"
+    stored = ledger.get(ledger_key)
+    if stored is None:
+        return False
+    ledger.touch(ledger_key)
+    if has_lwjgl_variant(variants, version, sha1):
+        return True
+    print("!!! New variant for LWJGL version %s" % version)
+    lwjgl = MetaVersion.parse_obj({**json.loads(stored), "releaseTime": release_time})
+    variants[version].append(LWJGLEntry(version=lwjgl, sha1=sha1))
+    return True
 
 
 def remove_paths_from_lib(lib):
@@ -237,28 +346,15 @@ def is_macos_only(rules: Optional[MojangRules]):
     return False
 
 
-def patch_library(lib: Library, patches: LibraryPatches) -> List[Library]:
-    to_patch = [lib]
+def patch_library(lib: Library, patches: LibraryPatchesWrap) -> List[Library]:
+    overrides, new_libraries = patches.expand(lib.name)
+    for override in overrides:
+        lib.merge(override)
 
-    new_libraries = []
-    while to_patch:
-        target = to_patch.pop(0)
+    return list(new_libraries)
 
-        for patch in patches:
-            if patch.applies(target):
-                if patch.override:
-                    target.merge(patch.override)
 
-                if patch.additionalLibraries:
-                    additional_copy = copy.deepcopy(patch.additionalLibraries)
-                    new_libraries += list(dict.fromkeys(additional_copy))
-                    if patch.patchAdditionalLibraries:
-                        to_patch += additional_copy
-
-    return new_libraries
-
-
-def process_single_variant(lwjgl_variant: MetaVersion, patches: LibraryPatches):
+def process_single_variant(lwjgl_variant: MetaVersion, patches: LibraryPatchesWrap):
     lwjgl_version = lwjgl_variant.version
     v = copy.deepcopy(lwjgl_variant)
 
@@ -332,202 +428,323 @@ def version_has_split_natives(v: MojangVersion) -> bool:
     return False
 
 
-def main():
-    # get the local version list
-    override_index = LegacyOverrideIndex.parse_file(STATIC_OVERRIDES_FILE)
-    legacy_services = LegacyServices.parse_file(STATIC_LEGACY_SERVICES_FILE)
-    library_patches = LibraryPatches.parse_file(LIBRARY_PATCHES_FILE)
-
-    found_any_lwjgl3 = False
-
-    for filename in os.listdir(os.path.join(UPSTREAM_DIR, VERSIONS_DIR)):
-        input_file = os.path.join(UPSTREAM_DIR, VERSIONS_DIR, filename)
-        if not input_file.endswith(".json"):
-            # skip non JSON files
-            continue
-        print("Processing", filename)
-        mojang_version = MojangVersion.parse_file(input_file)
-        v = mojang_version.to_meta_version(
-            "Minecraft", MINECRAFT_COMPONENT, mojang_version.id
+class GeneratedVersion(NamedTuple):
+    filename: str
+    fingerprint: str
+    # None if the existing output was still up to date
+    out_filename: Optional[str]
+    # (version, sha1, release time) of each LWJGL candidate
+    lwjgl: List[Tuple[str, str, str]]
+    # the candidates themselves, only if the version was generated
+    lwjgl_variants: List[MetaVersion]
+    lwjgl3: bool
+    # the validation stamp of the input file, stamps recorded in a worker would be lost otherwise
+    validation_stamp: Optional[Tuple[str, list]] = None
+    # the generated version, if the parent caches models
+    version: Optional[MetaVersion] = None
+    # the digests of the input file, if the worker had to compute them
+    input_digest: Optional[Tuple[str, list]] = None
+
+
+# static inputs of a worker process, see load_worker_state
+worker_state = None
+# whether workers send the versions they generated back, for the model cache of the parent
+keep_generated_models = False
+
+
+def load_worker_state(keep_models: bool = False):
+    global worker_state, keep_generated_models
+    keep_generated_models = keep_models
+    worker_state = (
+        LegacyOverrideIndex.parse_file(STATIC_OVERRIDES_FILE),
+        LegacyServices.parse_file(STATIC_LEGACY_SERVICES_FILE),
+        LibraryPatchesWrap(LibraryPatches.parse_file(LIBRARY_PATCHES_FILE)),
+        FingerprintLedger(
+            "generate_mojang",
+            [
+                STATIC_OVERRIDES_FILE,
+                STATIC_LEGACY_SERVICES_FILE,
+                LIBRARY_PATCHES_FILE,
+            ],
+        ),
+    )
+    return worker_state
+
+
+def generate_version(filename: str, force: bool = False) -> GeneratedVersion:
+    override_index, legacy_services, library_patches, ledger = worker_state
+    input_file = os.path.join(UPSTREAM_DIR, VERSIONS_DIR, filename)
+    input_path = os.path.abspath(input_file)
+    known_digest = file_digest_store().get(input_path)
+    fingerprint = ledger.input_fingerprint([input_file])
+    input_digest = file_digest_store().get(input_path)
+    input_digest = (input_path, input_digest) if input_digest != known_digest else None
+    entry = None if force else ledger.fresh_entry(filename, fingerprint)
+    if entry:
+        # the version file is up to date, but its LWJGL candidates still take part in picking variants
+        return GeneratedVersion(
+            filename,
+            fingerprint,
+            None,
+            [tuple(candidate) for candidate in entry["lwjgl"]],
+            [],
+            entry["lwjgl3"],
+            input_digest=input_digest,
         )
+    print("Processing", filename)
+    mojang_version = MojangVersion.parse_file_trusted(input_file)
+    validation_stamp = (input_path, validation_stamps().get(input_path))
+    v = mojang_version.to_meta_version(
+        "Minecraft", MINECRAFT_COMPONENT, mojang_version.id
+    )
 
-        libs_minecraft = []
-        new_libs_minecraft = []
-        is_lwjgl_3 = False
-        has_split_natives = version_has_split_natives(v)
-        buckets = {}
+    libs_minecraft = []
+    new_libs_minecraft = []
+    is_lwjgl_3 = False
+    has_split_natives = version_has_split_natives(v)
+    buckets = {}
+    lwjgl_candidates = []
+    lwjgl_variants = []
 
-        for lib in v.libraries:
-            specifier = lib.name
+    for lib in v.libraries:
+        specifier = lib.name
 
-            # generic fixes
-            remove_paths_from_lib(lib)
+        # generic fixes
+        remove_paths_from_lib(lib)
 
-            if APPLY_SPLIT_NATIVES_WORKAROUND and lib_is_split_native(lib):
-                # merge classifier into artifact name to workaround bug in launcher
-                specifier.artifact += f"-{specifier.classifier}"
-                specifier.classifier = None
+        if APPLY_SPLIT_NATIVES_WORKAROUND and lib_is_split_native(lib):
+            # merge classifier into artifact name to workaround bug in launcher
+            specifier = lib.name = specifier.replace(
+                artifact=f"{specifier.artifact}-{specifier.classifier}",
+                classifier=None,
+            )
 
-            if specifier.is_lwjgl():
-                if has_split_natives:  # implies lwjgl3
-                    bucket = add_or_get_bucket(buckets, None)
+        if specifier.is_lwjgl():
+            if has_split_natives:  # implies lwjgl3
+                bucket = add_or_get_bucket(buckets, None)
+                is_lwjgl_3 = True
+                bucket.version = specifier.version
+                if not bucket.libraries:
+                    bucket.libraries = []
+                bucket.libraries.append(lib)
+                bucket.release_time = v.release_time
+            else:
+                rules = None
+                if lib.rules:
+                    rules = lib.rules
+                    lib.rules = None
+                if is_macos_only(rules):
+                    print(
+                        "Candidate library ",
+                        specifier,
+                        " is only for macOS and is therefore ignored.",
+                    )
+                    continue
+                bucket = add_or_get_bucket(buckets, rules)
+                if (
+                    specifier.group == "org.lwjgl.lwjgl"
+                    and specifier.artifact == "lwjgl"
+                ):
+                    bucket.version = specifier.version
+                if specifier.group == "org.lwjgl" and specifier.artifact == "lwjgl":
                     is_lwjgl_3 = True
-                    found_any_lwjgl3 = True
                     bucket.version = specifier.version
-                    if not bucket.libraries:
-                        bucket.libraries = []
-                    bucket.libraries.append(lib)
-                    bucket.release_time = v.release_time
-                else:
-                    rules = None
-                    if lib.rules:
-                        rules = lib.rules
-                        lib.rules = None
-                    if is_macos_only(rules):
-                        print(
-                            "Candidate library ",
-                            specifier,
-                            " is only for macOS and is therefore ignored.",
-                        )
-                        continue
-                    bucket = add_or_get_bucket(buckets, rules)
-                    if (
-                        specifier.group == "org.lwjgl.lwjgl"
-                        and specifier.artifact == "lwjgl"
-                    ):
-                        bucket.version = specifier.version
-                    if specifier.group == "org.lwjgl" and specifier.artifact == "lwjgl":
-                        is_lwjgl_3 = True
-                        found_any_lwjgl3 = True
-                        bucket.version = specifier.version
-                    if not bucket.libraries:
-                        bucket.libraries = []
-                    bucket.libraries.append(lib)
-                    bucket.release_time = v.release_time
-            # FIXME: workaround for insane log4j nonsense from December 2021. Probably needs adjustment.
-            elif lib.name.is_log4j():
-                version_override, maven_override = map_log4j_artifact(lib.name.version)
-
-                if version_override and maven_override:
-                    if version_override not in LOG4J_HASHES:
-                        raise Exception(
-                            "ERROR: unhandled log4j version (overriden) %s!"
-                            % version_override
-                        )
-
-                    if lib.name.artifact not in LOG4J_HASHES[version_override]:
-                        raise Exception(
-                            "ERROR: unhandled log4j artifact %s!" % lib.name.artifact
-                        )
-
-                    replacement_name = GradleSpecifier(
-                        "org.apache.logging.log4j", lib.name.artifact, version_override
+                if not bucket.libraries:
+                    bucket.libraries = []
+                bucket.libraries.append(lib)
+                bucket.release_time = v.release_time
+        # FIXME: workaround for insane log4j nonsense from December 2021. Probably needs adjustment.
+        elif lib.name.is_log4j():
+            version_override, maven_override = map_log4j_artifact(lib.name.version)
+
+            if version_override and maven_override:
+                if version_override not in LOG4J_HASHES:
+                    raise Exception(
+                        "ERROR: unhandled log4j version (overriden) %s!"
+                        % version_override
                     )
-                    artifact = MojangArtifact(
-                        url=maven_override % (replacement_name.path()),
-                        sha1=LOG4J_HASHES[version_override][lib.name.artifact]["sha1"],
-                        size=LOG4J_HASHES[version_override][lib.name.artifact]["size"],
+
+                if lib.name.artifact not in LOG4J_HASHES[version_override]:
+                    raise Exception(
+                        "ERROR: unhandled log4j artifact %s!" % lib.name.artifact
                     )
 
-                    libs_minecraft.append(
-                        Library(
-                            name=replacement_name,
-                            downloads=MojangLibraryDownloads(artifact=artifact),
-                        )
+                replacement_name = GradleSpecifier(
+                    "org.apache.logging.log4j", lib.name.artifact, version_override
+                )
+                artifact = MojangArtifact(
+                    url=maven_override % (replacement_name.path()),
+                    sha1=LOG4J_HASHES[version_override][lib.name.artifact]["sha1"],
+                    size=LOG4J_HASHES[version_override][lib.name.artifact]["size"],
+                )
+
+                libs_minecraft.append(
+                    Library(
+                        name=replacement_name,
+                        downloads=MojangLibraryDownloads(artifact=artifact),
                     )
-                else:
-                    libs_minecraft.append(lib)
+                )
             else:
-                new_libs_minecraft += patch_library(lib, library_patches)
                 libs_minecraft.append(lib)
-        if len(buckets) == 1:
-            for key in buckets:
-                lwjgl = buckets[key]
-                lwjgl.libraries = sorted(lwjgl.libraries, key=attrgetter("name"))
-                add_lwjgl_version(lwjglVersionVariants, lwjgl)
-                print("Found only candidate LWJGL", lwjgl.version, key)
         else:
-            # multiple buckets for LWJGL. [None] is common to all, other keys are for different sets of rules
-            for key in buckets:
-                if key is None:
-                    continue
-                lwjgl = buckets[key]
-                if None in buckets:
-                    lwjgl.libraries = sorted(
-                        lwjgl.libraries + buckets[None].libraries,
-                        key=attrgetter("name"),
-                    )
-                else:
-                    lwjgl.libraries = sorted(lwjgl.libraries, key=attrgetter("name"))
-                add_lwjgl_version(lwjglVersionVariants, lwjgl)
-                print("Found candidate LWJGL", lwjgl.version, key)
-            # remove the common bucket...
+            new_libs_minecraft += patch_library(lib, library_patches)
+            libs_minecraft.append(lib)
+    if len(buckets) == 1:
+        for key in buckets:
+            lwjgl, sha1 = prepare_lwjgl_version(buckets[key])
+            lwjgl_candidates.append(
+                (lwjgl.version, sha1, lwjgl.release_time.isoformat())
+            )
+            lwjgl_variants.append(lwjgl)
+            print("Found only candidate LWJGL", lwjgl.version, key)
+    else:
+        # multiple buckets for LWJGL. [None] is common to all, other keys are for different sets of rules
+        for key in buckets:
+            if key is None:
+                continue
+            lwjgl = buckets[key]
             if None in buckets:
-                del buckets[None]
-        v.libraries = libs_minecraft + list(dict.fromkeys(new_libs_minecraft))
-
+                lwjgl.libraries = lwjgl.libraries + buckets[None].libraries
+            # sorts the libraries
+            lwjgl, sha1 = prepare_lwjgl_version(lwjgl)
+            lwjgl_candidates.append(
+                (lwjgl.version, sha1, lwjgl.release_time.isoformat())
+            )
+            lwjgl_variants.append(lwjgl)
+            print("Found candidate LWJGL", lwjgl.version, key)
+        # remove the common bucket...
+        if None in buckets:
+            del buckets[None]
+    v.libraries = libs_minecraft + list(dict.fromkeys(new_libs_minecraft))
+
+    if is_lwjgl_3:
+        lwjgl_dependency = Dependency(uid=LWJGL3_COMPONENT)
+    else:
+        lwjgl_dependency = Dependency(uid=LWJGL_COMPONENT)
+    if len(buckets) == 1:
+        suggested_version = next(iter(buckets.values())).version
         if is_lwjgl_3:
-            lwjgl_dependency = Dependency(uid=LWJGL3_COMPONENT)
+            lwjgl_dependency.suggests = suggested_version
         else:
-            lwjgl_dependency = Dependency(uid=LWJGL_COMPONENT)
-        if len(buckets) == 1:
-            suggested_version = next(iter(buckets.values())).version
-            if is_lwjgl_3:
-                lwjgl_dependency.suggests = suggested_version
-            else:
-                lwjgl_dependency.suggests = "2.9.4-nightly-20150209"
-        else:
-            bad_versions = {"3.1.6", "3.2.1"}
-            our_versions = set()
+            lwjgl_dependency.suggests = "2.9.4-nightly-20150209"
+    else:
+        bad_versions = {"3.1.6", "3.2.1"}
+        our_versions = set()
 
-            for lwjgl in iter(buckets.values()):
-                our_versions = our_versions.union({lwjgl.version})
+        for lwjgl in iter(buckets.values()):
+            our_versions = our_versions.union({lwjgl.version})
 
-            if our_versions == bad_versions:
-                print("Found broken 3.1.6/3.2.1 combo, forcing LWJGL to 3.2.1")
-                suggested_version = "3.2.1"
-                lwjgl_dependency.suggests = suggested_version
-            else:
-                raise Exception(
-                    "ERROR: cannot determine single suggested LWJGL version in %s"
-                    % mojang_version.id
-                )
-
-        # if it uses LWJGL 3, add the trait that enables starting on first thread on macOS
-        if is_lwjgl_3:
-            if not v.additional_traits:
-                v.additional_traits = []
-            v.additional_traits.append("FirstThreadOnMacOS")
-        v.requires = [lwjgl_dependency]
-        v.order = -2
-        # process 1.13 arguments into previous version
-        if not mojang_version.minecraft_arguments and mojang_version.arguments:
-            v.minecraft_arguments = adapt_new_style_arguments(mojang_version.arguments)
-            if not v.additional_traits:
-                v.additional_traits = []
-            v.additional_traits.extend(
-                adapt_new_style_arguments_to_traits(mojang_version.arguments)
+        if our_versions == bad_versions:
+            print("Found broken 3.1.6/3.2.1 combo, forcing LWJGL to 3.2.1")
+            suggested_version = "3.2.1"
+            lwjgl_dependency.suggests = suggested_version
+        else:
+            raise Exception(
+                "ERROR: cannot determine single suggested LWJGL version in %s"
+                % mojang_version.id
             )
-        out_filename = os.path.join(
-            LAUNCHER_DIR, MINECRAFT_COMPONENT, f"{v.version}.json"
+
+    # if it uses LWJGL 3, add the trait that enables starting on first thread on macOS
+    if is_lwjgl_3:
+        if not v.additional_traits:
+            v.additional_traits = []
+        v.additional_traits.append("FirstThreadOnMacOS")
+    v.requires = [lwjgl_dependency]
+    v.order = -2
+    # process 1.13 arguments into previous version
+    if not mojang_version.minecraft_arguments and mojang_version.arguments:
+        v.minecraft_arguments = adapt_new_style_arguments(mojang_version.arguments)
+        if not v.additional_traits:
+            v.additional_traits = []
+        v.additional_traits.extend(
+            adapt_new_style_arguments_to_traits(mojang_version.arguments)
         )
-        if v.version in override_index.versions:
-            override = override_index.versions[v.version]
-            override.apply_onto_meta_version(v)
-        if v.version in legacy_services:
-            if v.additional_traits == None:
-                v.additional_traits = []
-            v.additional_traits.append("legacyServices")
-
-        # 13w16a-13w23a require legacyLaunch and those + 13w23b require texturepacks
-        if re.match(r"13w[1,2]\d[a-c]", v.version) and 16 <= int(v.version[3:-1]) <= 23:
-            if v.additional_traits == None:
-                v.additional_traits = []
-            if v.version != "13w23b":
-                v.additional_traits.append("legacyLaunch")
-            v.additional_traits.append("texturepacks")
-
-        v.write(out_filename)
+    out_filename = os.path.join(LAUNCHER_DIR, MINECRAFT_COMPONENT, f"{v.version}.json")
+    if v.version in override_index.versions:
+        override = override_index.versions[v.version]
+        override.apply_onto_meta_version(v)
+    if v.version in legacy_services:
+        if v.additional_traits == None:
+            v.additional_traits = []
+        v.additional_traits.append("legacyServices")
+
+    # 13w16a-13w23a require legacyLaunch and those + 13w23b require texturepacks
+    if re.match(r"13w[1,2]\d[a-c]", v.version) and 16 <= int(v.version[3:-1]) <= 23:
+        if v.additional_traits == None:
+            v.additional_traits = []
+        if v.version != "13w23b":
+            v.additional_traits.append("legacyLaunch")
+        v.additional_traits.append("texturepacks")
+
+    v.write(out_filename)
+    return GeneratedVersion(
+        filename,
+        fingerprint,
+        out_filename,
+        lwjgl_candidates,
+        lwjgl_variants,
+        is_lwjgl_3,
+        validation_stamp,
+        v if keep_generated_models else None,
+        input_digest,
+    )
+
+
+def main():
+    _, _, library_patches, ledger = load_worker_state()
+    # so the workers start with the digests of the static inputs
+    save_file_digests()
+    found_any_lwjgl3 = False
+
+    filenames = [
+        filename
+        for filename in os.listdir(os.path.join(UPSTREAM_DIR, VERSIONS_DIR))
+        if filename.endswith(".json")
+    ]
+    # the pipeline runs other stages on threads next to this one, forking could copy their held locks
+    with ProcessPoolExecutor(
+        initializer=load_worker_state,
+        initargs=(model_cache_enabled(),),
+        mp_context=multiprocessing.get_context("forkserver"),
+    ) as executor:
+        stale = []
+
+        def results():
+            # results come back in directory order, so LWJGL variants are picked just like before
+            yield from executor.map(generate_version, filenames, chunksize=16)
+            yield from executor.map(partial(generate_version, force=True), stale)
+
+        for result in results():
+            if result.input_digest is not None:
+                file_digest_store().set(*result.input_digest)
+            if result.out_filename:
+                for candidate, lwjgl in zip(result.lwjgl, result.lwjgl_variants):
+                    add_lwjgl_version(lwjglVersionVariants, lwjgl, candidate[1], ledger)
+                ledger.record(
+                    result.filename,
+                    result.fingerprint,
+                    [result.out_filename],
+                    lwjgl=result.lwjgl,
+                    lwjgl3=result.lwjgl3,
+                )
+            else:
+                ledger.touch(result.filename)
+                restored = [
+                    restore_lwjgl_version(lwjglVersionVariants, ledger, candidate)
+                    for candidate in result.lwjgl
+                ]
+                if not all(restored):
+                    print(
+                        "LWJGL variants of", result.filename, "are gone, regenerating"
+                    )
+                    stale.append(result.filename)
+                    continue
+            found_any_lwjgl3 |= result.lwjgl3
+            if result.validation_stamp is not None:
+                validation_stamps().set(*result.validation_stamp)
+            if result.version is not None:
+                # later stages read the Minecraft versions, which were written in a worker
+                remember_model(result.out_filename, result.version)
 
     for lwjglVersionVariant in lwjglVersionVariants:
         decided_variant = None
@@ -588,6 +805,9 @@ def main():
         os.path.join(LAUNCHER_DIR, MINECRAFT_COMPONENT, "package.json")
     )
 
+    ledger.save()
+    save_validation_stamps()
+
 
 if __name__ == "__main__":
     main()
@@ -14,6 +14,7 @@ from meta.common.neoforge import (
 )
 from meta.common.forge import FORGEWRAPPER_LIBRARY
 from meta.common.mojang import MINECRAFT_COMPONENT
+from meta.common.store import FingerprintLedger
 from meta.model import (
     MetaVersion,
     Dependency,
@@ -22,6 +23,7 @@ from meta.model import (
     MojangLibraryDownloads,
     MojangArtifact,
     MetaPackage,
+    save_validation_stamps,
 )
 from meta.model.neoforge import (
     NeoForgeVersion,
@@ -49,7 +51,7 @@ def version_from_build_system_installer(
     v.maven_files = []
 
     # load the locally cached installer file info and use it to add the installer entry in the json
-    info = InstallerInfo.parse_file(
+    info = InstallerInfo.parse_file_trusted(
         os.path.join(UPSTREAM_DIR, INSTALLER_INFO_DIR, f"{version.long_version}.json")
     )
     installer_lib = Library(
@@ -100,6 +102,7 @@ def main():
         os.path.join(UPSTREAM_DIR, DERIVED_INDEX_FILE)
     )
     recommended_versions = []
+    ledger = FingerprintLedger("generate_neoforge", [])
 
     for key, entry in remote_versions.versions.items():
         version = NeoForgeVersion(entry)
@@ -131,13 +134,29 @@ def main():
         profile_filepath = os.path.join(
             UPSTREAM_DIR, INSTALLER_MANIFEST_DIR, f"{version.long_version}.json"
         )
+        out_filepath = os.path.join(
+            LAUNCHER_DIR, NEOFORGE_COMPONENT, f"{version.rawVersion}.json"
+        )
+
+        fingerprint = ledger.input_fingerprint(
+            [
+                installer_version_filepath,
+                profile_filepath,
+                os.path.join(
+                    UPSTREAM_DIR, INSTALLER_INFO_DIR, f"{version.long_version}.json"
+                ),
+            ],
+            entry.json(),
+        )
+        if ledger.fresh_entry(version.long_version, fingerprint):
+            continue
 
         eprint(installer_version_filepath)
         assert os.path.isfile(
             installer_version_filepath
         ), f"version {installer_version_filepath} does not have installer version manifest"
-        installer = MojangVersion.parse_file(installer_version_filepath)
-        profile = NeoForgeInstallerProfileV2.parse_file(profile_filepath)
+        installer = MojangVersion.parse_file_trusted(installer_version_filepath)
+        profile = NeoForgeInstallerProfileV2.parse_file_trusted(profile_filepath)
         v = version_from_build_system_installer(installer, profile, version)
 
         # we can get the minecraft version from the profile json info, so let's just do that instead of hacky regex
@@ -151,19 +170,23 @@ def main():
                 % (key, profile.minecraft)
             )
             continue
-        v.write(os.path.join(LAUNCHER_DIR, NEOFORGE_COMPONENT, f"{v.version}.json"))
+        v.write(out_filepath)
+        ledger.record(version.long_version, fingerprint, [out_filepath])
 
-        recommended_versions.sort()
+    recommended_versions.sort()
 
-        print("Recommended versions:", recommended_versions)
+    print("Recommended versions:", recommended_versions)
 
-        package = MetaPackage(
-            uid=NEOFORGE_COMPONENT,
-            name="NeoForge",
-            project_url="https://neoforged.net",
-        )
-        package.recommended = recommended_versions
-        package.write(os.path.join(LAUNCHER_DIR, NEOFORGE_COMPONENT, "package.json"))
+    package = MetaPackage(
+        uid=NEOFORGE_COMPONENT,
+        name="NeoForge",
+        project_url="https://neoforged.net",
+    )
+    package.recommended = recommended_versions
+    package.write(os.path.join(LAUNCHER_DIR, NEOFORGE_COMPONENT, "package.json"))
+
+    ledger.save()
+    save_validation_stamps()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,19 @@
 import hashlib
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from operator import attrgetter
 
-from meta.common import launcher_path, file_hash
+from meta.common import launcher_path
+from meta.common.store import file_digests, record_file_digests, save_file_digests
 
 
-from meta.model import MetaVersion, MetaPackage
+from meta.model import (
+    MetaVersion,
+    MetaPackage,
+    read_version_manifest,
+    write_version_manifest,
+)
 from meta.model.index import (
     MetaPackageIndex,
     MetaVersionIndex,
@@ -16,17 +24,24 @@ from meta.model.index import (
 LAUNCHER_DIR = launcher_path()
 
 
-# ignore these files when indexing versions
-ignore = {"index.json", "package.json", ".git", ".github"}
+# ignore these files when indexing versions, as well as hidden ones like .git and unfinished writes
+ignore = {"index.json", "package.json"}
+
 
-# initialize output structures - package list level
-packages = MetaPackageIndex()
+def version_manifest(filepath: str):
+    manifest = read_version_manifest(filepath)
+    if manifest is None:
+        # the file changed since it was last indexed, parse and hash it
+        with open(filepath, "rb") as f:
+            data = f.read()
+        versionFile = MetaVersion.parse_raw(data)
+        manifest = write_version_manifest(
+            filepath, hashlib.sha256(data).hexdigest(), versionFile
+        )
+    return manifest
 
-# walk through all the package folders
-for package in sorted(os.listdir(LAUNCHER_DIR)):
-    if package in ignore:
-        continue
 
+def index_package(package: str) -> MetaPackageIndexEntry:
     sharedData = MetaPackage.parse_file(
         os.path.join(LAUNCHER_DIR, package, "package.json")
     )
@@ -39,17 +54,13 @@ for package in sorted(os.listdir(LAUNCHER_DIR)):
 
     # walk through all the versions of the package
     for filename in os.listdir(LAUNCHER_DIR + "/%s" % package):
-        if filename in ignore:
+        if filename in ignore or filename.startswith("."):
             continue
-        # parse and hash the version file
-        filepath = LAUNCHER_DIR + "/%s/%s" % (package, filename)
-        filehash = file_hash(filepath, hashlib.sha256)
-        versionFile = MetaVersion.parse_file(filepath)
-        is_recommended = versionFile.version in recommendedVersions
-
-        versionEntry = MetaVersionIndexEntry.from_meta_version(
-            versionFile, is_recommended, filehash
+        manifest = version_manifest(LAUNCHER_DIR + "/%s/%s" % (package, filename))
+        versionEntry = MetaVersionIndexEntry.parse_obj(
+            {**manifest["index"], "sha256": manifest["sha256"]}
         )
+        versionEntry.recommended = versionEntry.version in recommendedVersions
 
         versionList.versions.append(versionEntry)
 
@@ -63,9 +74,40 @@ for package in sorted(os.listdir(LAUNCHER_DIR)):
     versionList.write(outFilePath)
 
     # insert entry into the package index
-    packageEntry = MetaPackageIndexEntry(
-        uid=package, name=sharedData.name, sha256=file_hash(outFilePath, hashlib.sha256)
+    entry = MetaPackageIndexEntry(
+        uid=package,
+        name=sharedData.name,
+        sha256=file_digests(outFilePath, ["sha256"])["sha256"],
     )
-    packages.packages.append(packageEntry)
+    return entry
+
+
+def main():
+    # initialize output structures - package list level
+    packages = MetaPackageIndex()
+
+    # walk through all the package folders
+    package_dirs = [
+        package
+        for package in sorted(os.listdir(LAUNCHER_DIR))
+        if package not in ignore and not package.startswith(".")
+    ]
+    # forking could copy locks held by the other threads of the pipeline
+    with ProcessPoolExecutor(
+        mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        packages.packages = list(executor.map(index_package, package_dirs))
+
+    # digests of the package indexes were computed in the workers, record them in one go
+    for entry in packages.packages:
+        record_file_digests(
+            os.path.join(LAUNCHER_DIR, entry.uid, "index.json"),
+            {"sha256": entry.sha256},
+        )
+    save_file_digests()
+
+    packages.write(os.path.join(LAUNCHER_DIR, "index.json"))
+
 
-packages.write(os.path.join(LAUNCHER_DIR, "index.json"))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Run all update and generate stages in a single process, sharing one HTTP session and the models written by earlier
+stages. Stages that do not touch each other's files run concurrently.
+"""
+
+import concurrent.futures
+import importlib
+import os
+import subprocess
+import sys
+import traceback
+from typing import NamedTuple, Tuple, List, Dict
+
+from meta.common import eprint, upstream_path, launcher_path
+from meta.common import mojang, forge, neoforge, fabric, quilt, liteloader, java
+from meta.model import enable_model_cache
+
+
+class Stage(NamedTuple):
+    name: str
+    # paths prefixed with "upstream/" or "launcher/", a directory covers everything below it
+    reads: Tuple[str, ...] = ()
+    writes: Tuple[str, ...] = ()
+
+
+def upstream(*paths: str) -> Tuple[str, ...]:
+    return tuple(f"upstream/{path}" for path in paths)
+
+
+def launcher(*paths: str) -> Tuple[str, ...]:
+    return tuple(f"launcher/{path}" for path in paths)
+
+
+UPDATE_STAGES = [
+    Stage("update_mojang", writes=upstream(mojang.BASE_DIR)),
+    Stage("update_forge", writes=upstream(forge.BASE_DIR)),
+    Stage("update_neoforge", writes=upstream(neoforge.BASE_DIR)),
+    Stage("update_fabric", writes=upstream(fabric.BASE_DIR)),
+    Stage("update_quilt", writes=upstream(quilt.BASE_DIR)),
+    Stage("update_liteloader", writes=upstream(liteloader.BASE_DIR)),
+    Stage("update_java", writes=upstream(java.BASE_DIR)),
+]
+
+GENERATE_STAGES = [
+    Stage(
+        "generate_mojang",
+        reads=upstream(mojang.BASE_DIR),
+        writes=launcher(
+            mojang.MINECRAFT_COMPONENT, mojang.LWJGL_COMPONENT, mojang.LWJGL3_COMPONENT
+        ),
+    ),
+    Stage(
+        "generate_forge",
+        reads=upstream(forge.BASE_DIR) + launcher(mojang.MINECRAFT_COMPONENT),
+        writes=launcher(forge.FORGE_COMPONENT),
+    ),
+    Stage(
+        "generate_neoforge",
+        reads=upstream(neoforge.BASE_DIR) + launcher(mojang.MINECRAFT_COMPONENT),
+        writes=launcher(neoforge.NEOFORGE_COMPONENT),
+    ),
+    Stage(
+        "generate_fabric",
+        reads=upstream(fabric.BASE_DIR),
+        writes=launcher(fabric.LOADER_COMPONENT, fabric.INTERMEDIARY_COMPONENT),
+    ),
+    Stage(
+        "generate_quilt",
+        reads=upstream(quilt.BASE_DIR),
+        writes=launcher(quilt.LOADER_COMPONENT)
+        + (launcher(quilt.INTERMEDIARY_COMPONENT) if quilt.USE_QUILT_MAPPINGS else ()),
+    ),
+    Stage(
+        "generate_liteloader",
+        reads=upstream(liteloader.BASE_DIR),
+        writes=launcher(liteloader.LITELOADER_COMPONENT),
+    ),
+    Stage(
+        "generate_java",
+        reads=upstream(java.BASE_DIR, mojang.JAVA_MANIFEST_FILE)
+        + launcher(mojang.MINECRAFT_COMPONENT),
+        writes=launcher(
+            java.JAVA_MINECRAFT_COMPONENT,
+            java.JAVA_ADOPTIUM_COMPONENT,
+            java.JAVA_OPENJ9_COMPONENT,
+            java.JAVA_AZUL_COMPONENT,
+            java.JAVA_RESOLUTION_COMPONENT,
+        ),
+    ),
+    Stage("index", reads=("launcher",), writes=("launcher",)),
+]
+
+# a failing stage resets the repositories of all phases that were run, like fail_in/fail_out in update.sh
+PHASES = {
+    "update": (UPDATE_STAGES, upstream_path),
+    "generate": (GENERATE_STAGES, launcher_path),
+}
+
+
+def overlaps(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def depends_on(stage: Stage, earlier: Stage) -> bool:
+    for path in stage.reads:
+        if any(overlaps(path, other) for other in earlier.writes):
+            return True
+    for path in stage.writes:
+        if any(overlaps(path, other) for other in earlier.reads + earlier.writes):
+            return True
+    return False
+
+
+def stage_dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    # stages are declared in a valid serial order, so only earlier stages can be dependencies
+    return {
+        stage.name: [
+            earlier.name for earlier in stages[:i] if depends_on(stage, earlier)
+        ]
+        for i, stage in enumerate(stages)
+    }
+
+
+def cached_model_paths(stages: List[Stage]) -> List[str]:
+    """
+    The files and directories some stage reads models from. index reads all of launcher/ through the version
+    manifests instead, so whole repositories are left out.
+    """
+    roots = {"upstream": upstream_path(), "launcher": launcher_path()}
+    paths = set()
+    for stage in stages:
+        for path in stage.reads:
+            root, _, subpath = path.partition("/")
+            if subpath:
+                paths.add(os.path.join(roots[root], subpath))
+    return sorted(paths)
+
+
+def reset_repository(path: str):
+    subprocess.run(["git", "-C", path, "reset", "--hard", "HEAD"])
+
+
+def run_stage(stage: str):
+    print(f"Running {stage}")
+    module = importlib.import_module(f"meta.run.{stage}")
+    module.main()
+    print(f"Finished {stage}")
+
+
+def run_stages(stages: List[Stage]) -> bool:
+    dependencies = stage_dependencies(stages)
+    pending = list(stages)
+    done = set()
+    failed = False
+    running: Dict[concurrent.futures.Future, Stage] = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        while running or (pending and not failed):
+            if not failed:
+                for stage in list(pending):
+                    if not all(dep in done for dep in dependencies[stage.name]):
+                        continue
+                    pending.remove(stage)
+                    running[executor.submit(run_stage, stage.name)] = stage
+
+            assert running, "No stage can be started"
+
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                stage = running.pop(future)
+                e = future.exception()
+                if e is None:
+                    done.add(stage.name)
+                    continue
+                traceback.print_exception(type(e), e, e.__traceback__)
+                eprint(f"Stage {stage.name} failed")
+                failed = True
+
+    return not failed
+
+
+def main():
+    phases = sys.argv[1:] or list(PHASES)
+    for phase in phases:
+        if phase not in PHASES:
+            eprint(f"Unknown phase {phase}, expected one of {', '.join(PHASES)}")
+            sys.exit(2)
+
+    stages = [stage for phase in phases for stage in PHASES[phase][0]]
+    enable_model_cache(cached_model_paths(stages))
+    if not run_stages(stages):
+        for phase in phases:
+            repository_path = PHASES[phase][1]()
+            eprint(f"Resetting {repository_path}")
+            reset_repository(repository_path)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
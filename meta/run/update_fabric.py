@@ -1,5 +1,3 @@
-from collections import deque
-from multiprocessing import Pool
 import json
 import os
 import zipfile
@@ -11,8 +9,8 @@ from meta.common import (
     upstream_path,
     ensure_upstream_dir,
     transform_maven_key,
-    default_session,
 )
+from meta.common.http import Revalidator, default_fetcher, download_binary_file
 from meta.common.fabric import (
     JARS_DIR,
     INSTALLER_INFO_DIR,
@@ -27,7 +25,7 @@ ensure_upstream_dir(JARS_DIR)
 ensure_upstream_dir(INSTALLER_INFO_DIR)
 ensure_upstream_dir(META_DIR)
 
-sess = default_session()
+fetcher = default_fetcher()
 
 
 def get_maven_url(maven_key, server, ext):
@@ -39,9 +37,9 @@ def get_maven_url(maven_key, server, ext):
     return maven_url
 
 
-def get_json_file(path, url):
+def get_json_file(path, url, get=None):
     with open(path, "w", encoding="utf-8") as f:
-        r = sess.get(url)
+        r = (get or fetcher.get)(url)
         r.raise_for_status()
         version_json = r.json()
         json.dump(version_json, f, sort_keys=True, indent=4)
@@ -49,19 +47,11 @@ def get_json_file(path, url):
 
 
 def head_file(url):
-    r = sess.head(url)
+    r = fetcher.head(url)
     r.raise_for_status()
     return r.headers
 
 
-def get_binary_file(path, url):
-    r = sess.get(url)
-    r.raise_for_status()
-    with open(path, "wb") as f:
-        for chunk in r.iter_content(chunk_size=128):
-            f.write(chunk)
-
-
 def compute_jar_file(path, url):
     # These two approaches should result in the same metadata, except for the timestamp which might be a few minutes
     # off for the fallback method
@@ -74,7 +64,7 @@ def compute_jar_file(path, url):
         print(f"Falling back to downloading jar for {url}")
 
         jar_path = path + ".jar"
-        get_binary_file(jar_path, url)
+        download_binary_file(fetcher, jar_path, url)
         tstamp = datetime.fromtimestamp(0)
         with zipfile.ZipFile(jar_path) as jar:
             allinfo = jar.infolist()
@@ -97,6 +87,21 @@ def compute_jar_file_concurrent(it):
     print(f"Processing {it['version']} Done")
 
 
+def load_index(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {it["maven"]: it for it in json.load(f)}
+
+
+def needs_jar_info(known, it):
+    # jars on maven don't change, so their info only has to be computed once per version list entry
+    if known.get(it["maven"]) != it:
+        return True
+    path = os.path.join(UPSTREAM_DIR, JARS_DIR, transform_maven_key(it["maven"]))
+    return not os.path.isfile(path + ".json")
+
+
 def get_json_file_concurrent(it):
     print(f"Downloading JAR info for loader {it['version']} ")
     maven_url = get_maven_url(it["maven"], "https://maven.fabricmc.net/", ".json")
@@ -108,25 +113,47 @@ def get_json_file_concurrent(it):
 
 
 def main():
+    components = ["intermediary", "loader"]
+    revalidator = Revalidator(
+        fetcher,
+        "fabric",
+        outputs=[
+            os.path.join(UPSTREAM_DIR, META_DIR, f"{component}.json")
+            for component in components
+        ],
+    )
+    if revalidator.unchanged(
+        [
+            "https://meta.fabricmc.net/v2/versions/" + component
+            for component in components
+        ]
+    ):
+        print("Fabric is unchanged upstream, nothing to update")
+        return
+
     # get the version list for each component we are interested in
-    for component in ["intermediary", "loader"]:
+    for component in components:
+        index_path = os.path.join(UPSTREAM_DIR, META_DIR, f"{component}.json")
+        known = load_index(index_path)
         index = get_json_file(
-            os.path.join(UPSTREAM_DIR, META_DIR, f"{component}.json"),
+            index_path,
             "https://meta.fabricmc.net/v2/versions/" + component,
+            revalidator.get,
         )
-        with Pool(None) as pool:
-            deque(pool.imap_unordered(compute_jar_file_concurrent, index, 32), 0)
+        pending = [it for it in index if needs_jar_info(known, it)]
+        print(f"{len(index) - len(pending)} {component} jars are unchanged")
+        for _ in fetcher.map(compute_jar_file_concurrent, pending):
+            pass
 
     # for each loader, download installer JSON file from maven
     with open(
         os.path.join(UPSTREAM_DIR, META_DIR, "loader.json"), "r", encoding="utf-8"
     ) as loaderVersionIndexFile:
         loader_version_index = json.load(loaderVersionIndexFile)
-        with Pool(None) as pool:
-            deque(
-                pool.imap_unordered(get_json_file_concurrent, loader_version_index, 32),
-                0,
-            )
+        for _ in fetcher.map(get_json_file_concurrent, loader_version_index):
+            pass
+
+    revalidator.commit()
 
 
 if __name__ == "__main__":
@@ -2,14 +2,12 @@
 Get the source files necessary for generating Forge versions
 """
 
-import concurrent.futures
 import copy
-import hashlib
 import json
 import os
 import re
 import zipfile
-from contextlib import suppress
+from contextlib import nullcontext, suppress
 from datetime import datetime
 from pathlib import Path
 from pprint import pprint
@@ -19,10 +17,8 @@ from pydantic import ValidationError
 from meta.common import (
     upstream_path,
     ensure_upstream_dir,
-    default_session,
     remove_files,
     eprint,
-    file_hash,
     get_file_sha1_from_file,
 )
 from meta.common.forge import (
@@ -46,7 +42,16 @@ from meta.model.forge import (
     InstallerInfo,
     ForgeLegacyInfo,
 )
-from meta.common.http import download_binary_file
+from meta.common.http import (
+    default_fetcher,
+    download_binary_file,
+    fetch_checksum,
+    RangeRequestsUnsupported,
+    RemoteZipFile,
+    Revalidator,
+)
+from meta.common.store import file_digests, save_file_digests
+from meta.model import save_validation_stamps
 from meta.model.mojang import MojangVersion
 
 UPSTREAM_DIR = upstream_path()
@@ -59,7 +64,14 @@ ensure_upstream_dir(FILE_MANIFEST_DIR)
 
 LEGACYINFO_PATH = os.path.join(UPSTREAM_DIR, LEGACYINFO_FILE)
 
-sess = default_session()
+fetcher = default_fetcher()
+
+MAVEN_METADATA_URL = (
+    "https://files.minecraftforge.net/net/minecraftforge/forge/maven-metadata.json"
+)
+PROMOTIONS_URL = (
+    "https://files.minecraftforge.net/net/minecraftforge/forge/promotions_slim.json"
+)
 
 
 def get_single_forge_files_manifest(longversion):
@@ -76,7 +88,7 @@ def get_single_forge_files_manifest(longversion):
             "https://files.minecraftforge.net/net/minecraftforge/forge/%s/meta.json"
             % longversion
         )
-        r = sess.get(file_url)
+        r = fetcher.get(file_url)
         r.raise_for_status()
         files_json = r.json()
 
@@ -152,7 +164,7 @@ def process_forge_version(version, jar_path):
     sha1_file = jar_path + ".sha1"
     fileSha1 = get_file_sha1_from_file(jar_path, sha1_file)
     try:
-        rfile = sess.get(version.url() + ".sha1")
+        rfile = fetcher.get(version.url() + ".sha1")
         rfile.raise_for_status()
         new_sha1 = rfile.text.strip()
         if fileSha1 != new_sha1:
@@ -165,14 +177,20 @@ def process_forge_version(version, jar_path):
         installer_info_path
     )
 
+    installer = None
+    downloaded = None
     if installer_refresh_required:
         # grab the installer if it's not there
         if not os.path.isfile(jar_path):
-            eprint("Downloading %s" % version.url())
-            download_binary_file(sess, jar_path, version.url())
+            try:
+                # only what's needed gets downloaded, if the server supports it
+                installer = RemoteZipFile(fetcher, version.url())
+            except RangeRequestsUnsupported:
+                eprint("Downloading %s" % version.url())
+                downloaded = download_binary_file(fetcher, jar_path, version.url())
             if new_sha1 is None:
                 try:
-                    rfile = sess.get(version.url() + ".sha1")
+                    rfile = fetcher.get(version.url() + ".sha1")
                     rfile.raise_for_status()
                     new_sha1 = rfile.text.strip()
                 except Exception as e:
@@ -182,79 +200,110 @@ def process_forge_version(version, jar_path):
                 with open(sha1_file, "w") as file:
                     file.write(new_sha1)
 
-    eprint("Processing %s" % version.url())
-    # harvestables from the installer
-    if not os.path.isfile(profile_path):
-        print(jar_path)
-        with zipfile.ZipFile(jar_path) as jar:
-            with suppress(KeyError):
-                with jar.open("version.json") as profile_zip_entry:
-                    version_data = profile_zip_entry.read()
-
+    # closes the remote installer on every path, not just after harvesting it
+    with installer or nullcontext():
+        eprint("Processing %s" % version.url())
+        # harvestables from the installer
+        if not os.path.isfile(profile_path):
+            print(jar_path)
+            with installer or zipfile.ZipFile(jar_path) as jar:
+                with suppress(KeyError):
+                    with jar.open("version.json") as profile_zip_entry:
+                        version_data = profile_zip_entry.read()
+
+                        try:
+                            # Process: does it parse?
+                            MojangVersion.parse_raw(version_data)
+                        except Exception as e:
+                            e.add_note(f"version_data: {version_data}")
+                            raise e
+
+                        with open(version_file_path, "wb") as versionJsonFile:
+                            versionJsonFile.write(version_data)
+                            versionJsonFile.close()
+                        MojangVersion.stamp_validated(version_file_path)
+
+                with jar.open("install_profile.json") as profile_zip_entry:
+                    install_profile_data = profile_zip_entry.read()
+
+                    # Process: does it parse?
+                    is_parsable = False
+                    exception = None
+                    valid_models = []
                     try:
-                        # Process: does it parse?
-                        MojangVersion.parse_raw(version_data)
-                    except Exception as e:
-                        e.add_note(f"version_data: {version_data}")
-                        raise e
-
-                    with open(version_file_path, "wb") as versionJsonFile:
-                        versionJsonFile.write(version_data)
-                        versionJsonFile.close()
-
-            with jar.open("install_profile.json") as profile_zip_entry:
-                install_profile_data = profile_zip_entry.read()
-
-                # Process: does it parse?
-                is_parsable = False
-                exception = None
-                try:
-                    ForgeInstallerProfile.parse_raw(install_profile_data)
-                    is_parsable = True
-                except ValidationError as err:
-                    exception = err
-                try:
-                    ForgeInstallerProfileV2.parse_raw(install_profile_data)
-                    is_parsable = True
-                except ValidationError as err:
-                    exception = err
-
-                if not is_parsable:
-                    if version.is_supported():
-                        raise exception
-                    else:
-                        eprint(
-                            "Version %s is not supported and won't be generated later."
-                            % version.long_version
-                        )
-
-                with open(profile_path, "wb") as profileFile:
-                    profileFile.write(install_profile_data)
-                    profileFile.close()
-
-    # installer info v1
-    if not os.path.isfile(installer_info_path):
-        installer_info = InstallerInfo()
-        installer_info.sha1hash = file_hash(jar_path, hashlib.sha1)
-        installer_info.sha256hash = file_hash(jar_path, hashlib.sha256)
-        installer_info.size = os.path.getsize(jar_path)
-        installer_info.write(installer_info_path)
+                        ForgeInstallerProfile.parse_raw(install_profile_data)
+                        is_parsable = True
+                        valid_models.append(ForgeInstallerProfile)
+                    except ValidationError as err:
+                        exception = err
+                    try:
+                        ForgeInstallerProfileV2.parse_raw(install_profile_data)
+                        is_parsable = True
+                        valid_models.append(ForgeInstallerProfileV2)
+                    except ValidationError as err:
+                        exception = err
+
+                    if not is_parsable:
+                        if version.is_supported():
+                            raise exception
+                        else:
+                            eprint(
+                                "Version %s is not supported and won't be generated later."
+                                % version.long_version
+                            )
+
+                    with open(profile_path, "wb") as profileFile:
+                        profileFile.write(install_profile_data)
+                        profileFile.close()
+                    for model in valid_models:
+                        model.stamp_validated(profile_path)
+
+        # installer info v1
+        if not os.path.isfile(installer_info_path):
+            installer_info = InstallerInfo()
+            if installer is not None:
+                # the maven publishes the checksums of the installer next to it
+                installer_info.sha1hash = new_sha1
+                installer_info.sha256hash = fetch_checksum(
+                    fetcher, version.url() + ".sha256"
+                )
+                installer_info.size = installer.size
+            if not installer_info.sha1hash or not installer_info.sha256hash:
+                if not os.path.isfile(jar_path):
+                    eprint("Downloading %s" % version.url())
+                    downloaded = download_binary_file(fetcher, jar_path, version.url())
+                if downloaded is not None:
+                    installer_info.sha1hash = downloaded.sha1
+                    installer_info.sha256hash = downloaded.sha256
+                    installer_info.size = downloaded.size
+                else:
+                    digests = file_digests(jar_path)
+                    installer_info.sha1hash = digests["sha1"]
+                    installer_info.sha256hash = digests["sha256"]
+                    installer_info.size = os.path.getsize(jar_path)
+            installer_info.write(installer_info_path)
 
 
 def main():
-    # get the remote version list fragments
-    r = sess.get(
-        "https://files.minecraftforge.net/net/minecraftforge/forge/maven-metadata.json"
+    revalidator = Revalidator(
+        fetcher,
+        "forge",
+        outputs=[
+            UPSTREAM_DIR + "/forge/maven-metadata.json",
+            UPSTREAM_DIR + "/forge/promotions_slim.json",
+            UPSTREAM_DIR + "/forge/derived_index.json",
+            LEGACYINFO_PATH,
+        ],
     )
-    r.raise_for_status()
-    main_json = r.json()
+    if revalidator.unchanged([MAVEN_METADATA_URL, PROMOTIONS_URL]):
+        print("Forge is unchanged upstream, nothing to update")
+        return
+
+    # get the remote version list fragments
+    main_json = revalidator.get(MAVEN_METADATA_URL).json()
     assert type(main_json) == dict
 
-    r = sess.get(
-        "https://files.minecraftforge.net/net/minecraftforge/forge/promotions_slim.json"
-    )
-    r.raise_for_status()
-    promotions_json = r.json()
+    promotions_json = revalidator.get(PROMOTIONS_URL).json()
     assert type(promotions_json) == dict
 
     promoted_key_expression = re.compile(
@@ -300,6 +349,7 @@ def main():
 
     print("")
     print("Processing versions:")
+    versions = []
     for mc_version, value in main_json.items():
         assert type(mc_version) == str
         assert type(value) == list
@@ -310,37 +360,42 @@ def main():
                 pprint(long_version)
                 assert match
             assert match.group("mc") == mc_version
+            versions.append((mc_version, long_version, match))
 
-            files = get_single_forge_files_manifest(long_version)
-
-            build = int(match.group("build"))
-            version = match.group("ver")
-            branch = match.group("branch")
-
-            is_recommended = version in recommended_set
-
-            entry = ForgeEntry(
-                long_version=long_version,
-                mc_version=mc_version,
-                version=version,
-                build=build,
-                branch=branch,
-                # NOTE: we add this later after the fact. The forge promotions file lies about these.
-                latest=False,
-                recommended=is_recommended,
-                files=files,
-            )
-            new_index.versions[long_version] = entry
-            if not new_index.by_mc_version:
-                new_index.by_mc_version = dict()
-            if mc_version not in new_index.by_mc_version:
-                new_index.by_mc_version.setdefault(mc_version, ForgeMCVersionInfo())
-            new_index.by_mc_version[mc_version].versions.append(long_version)
+    # the manifests are fetched concurrently, but come back in order
+    files_manifests = fetcher.map(
+        get_single_forge_files_manifest,
+        [long_version for _, long_version, _ in versions],
+    )
+    for (mc_version, long_version, match), files in zip(versions, files_manifests):
+        build = int(match.group("build"))
+        version = match.group("ver")
+        branch = match.group("branch")
+
+        is_recommended = version in recommended_set
+
+        entry = ForgeEntry(
+            long_version=long_version,
+            mc_version=mc_version,
+            version=version,
+            build=build,
+            branch=branch,
             # NOTE: we add this later after the fact. The forge promotions file lies about these.
-            # if entry.latest:
-            # new_index.by_mc_version[mc_version].latest = long_version
-            if entry.recommended:
-                new_index.by_mc_version[mc_version].recommended = long_version
+            latest=False,
+            recommended=is_recommended,
+            files=files,
+        )
+        new_index.versions[long_version] = entry
+        if not new_index.by_mc_version:
+            new_index.by_mc_version = dict()
+        if mc_version not in new_index.by_mc_version:
+            new_index.by_mc_version.setdefault(mc_version, ForgeMCVersionInfo())
+        new_index.by_mc_version[mc_version].versions.append(long_version)
+        # NOTE: we add this later after the fact. The forge promotions file lies about these.
+        # if entry.latest:
+        # new_index.by_mc_version[mc_version].latest = long_version
+        if entry.recommended:
+            new_index.by_mc_version[mc_version].recommended = long_version
 
     print("")
     print("Post processing promotions and adding missing 'latest':")
@@ -365,59 +420,67 @@ def main():
 
     print("Grabbing installers and dumping installer profiles...")
     # get the installer jars - if needed - and get the installer profiles out of them
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = []
-        for key, entry in new_index.versions.items():
-            eprint("Updating Forge %s" % key)
-            if entry.mc_version is None:
-                eprint("Skipping %d with invalid MC version" % entry.build)
-                continue
+    installers = []
+    for key, entry in new_index.versions.items():
+        eprint("Updating Forge %s" % key)
+        if entry.mc_version is None:
+            eprint("Skipping %d with invalid MC version" % entry.build)
+            continue
 
-            version = ForgeVersion(entry)
-            if version.url() is None:
-                eprint("Skipping %d with no valid files" % version.build)
-                continue
-            if version.long_version in BAD_VERSIONS:
-                eprint(f"Skipping bad version {version.long_version}")
-                continue
+        version = ForgeVersion(entry)
+        if version.url() is None:
+            eprint("Skipping %d with no valid files" % version.build)
+            continue
+        if version.long_version in BAD_VERSIONS:
+            eprint(f"Skipping bad version {version.long_version}")
+            continue
 
-            jar_path = os.path.join(UPSTREAM_DIR, JARS_DIR, version.filename())
+        jar_path = os.path.join(UPSTREAM_DIR, JARS_DIR, version.filename())
 
-            if version.uses_installer():
-                futures.append(
-                    executor.submit(process_forge_version, version, jar_path)
-                )
-            else:
-                # ignore the two versions without install manifests and jar mod class files
-                # TODO: fix those versions?
-                if version.mc_version_sane == "1.6.1":
-                    continue
-
-                # only gather legacy info if it's missing
-                if not os.path.isfile(LEGACYINFO_PATH):
-                    # grab the jar/zip if it's not there
-                    if not os.path.isfile(jar_path):
-                        download_binary_file(sess, jar_path, version.url())
-                    # find the latest timestamp in the zip file
-                    tstamp = datetime.fromtimestamp(0)
-                    with zipfile.ZipFile(jar_path) as jar:
-                        for info in jar.infolist():
-                            tstamp_new = datetime(*info.date_time)
-                            if tstamp_new > tstamp:
-                                tstamp = tstamp_new
-                    legacy_info = ForgeLegacyInfo()
-                    legacy_info.release_time = tstamp
-                    legacy_info.sha1 = file_hash(jar_path, hashlib.sha1)
-                    legacy_info.sha256 = file_hash(jar_path, hashlib.sha256)
+        if version.uses_installer():
+            installers.append((version, jar_path))
+        else:
+            # ignore the two versions without install manifests and jar mod class files
+            # TODO: fix those versions?
+            if version.mc_version_sane == "1.6.1":
+                continue
+
+            # only gather legacy info if it's missing
+            if not os.path.isfile(LEGACYINFO_PATH):
+                # grab the jar/zip if it's not there
+                downloaded = None
+                if not os.path.isfile(jar_path):
+                    downloaded = download_binary_file(fetcher, jar_path, version.url())
+                # find the latest timestamp in the zip file
+                tstamp = datetime.fromtimestamp(0)
+                with zipfile.ZipFile(jar_path) as jar:
+                    for info in jar.infolist():
+                        tstamp_new = datetime(*info.date_time)
+                        if tstamp_new > tstamp:
+                            tstamp = tstamp_new
+                legacy_info = ForgeLegacyInfo()
+                legacy_info.release_time = tstamp
+                if downloaded is not None:
+                    legacy_info.sha1 = downloaded.sha1
+                    legacy_info.sha256 = downloaded.sha256
+                    legacy_info.size = downloaded.size
+                else:
+                    digests = file_digests(jar_path)
+                    legacy_info.sha1 = digests["sha1"]
+                    legacy_info.sha256 = digests["sha256"]
                     legacy_info.size = os.path.getsize(jar_path)
-                    legacy_info_list.number[key] = legacy_info
-        for f in futures:
-            f.result()
+                legacy_info_list.number[key] = legacy_info
+    for _ in fetcher.map(lambda item: process_forge_version(*item), installers):
+        pass
 
     # only write legacy info if it's missing
     if not os.path.isfile(LEGACYINFO_PATH):
         legacy_info_list.write(LEGACYINFO_PATH)
 
+    save_validation_stamps()
+    save_file_digests()
+    revalidator.commit()
+
 
 if __name__ == "__main__":
     main()
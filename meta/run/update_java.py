@@ -1,6 +1,12 @@
+import concurrent.futures
 import os
+import time
+from functools import partial
+from typing import Callable, Collection, List
 
-from meta.common import upstream_path, ensure_upstream_dir, default_session
+from meta.common import upstream_path, ensure_upstream_dir, remove_files
+from meta.common.http import default_fetcher
+from meta.common.store import JsonStore
 from meta.common.java import (
     BASE_DIR,
     ADOPTIUM_DIR,
@@ -9,11 +15,14 @@ from meta.common.java import (
     ADOPTIUM_VERSIONS_DIR,
     OPENJ9_VERSIONS_DIR,
     AZUL_VERSIONS_DIR,
+    AZUL_DETAILS_FILE,
 )
+from meta.model import save_validation_stamps
 from meta.model.java import (
     ADOPTIUM_API_BASE,
     OPENJ9_API_BASE,
     ADOPTX_API_AVAILABLE_RELEASES,
+    ADOPTX_API_MAX_PAGE_SIZE,
     adoptxAPIFeatureReleasesUrl,
     adoptiumAPIFeatureReleasesUrl,
     openj9APIFeatureReleasesUrl,
@@ -34,6 +43,7 @@ from meta.model.java import (
     AzulJavaPackageType,
     azulApiPackageDetailUrl,
     ZuluPackageDetail,
+    ZuluPackageDetailIndex,
     ZuluPackagesDetail,
 )
 
@@ -48,107 +58,202 @@ ensure_upstream_dir(OPENJ9_VERSIONS_DIR)
 ensure_upstream_dir(AZUL_VERSIONS_DIR)
 
 
-sess = default_session()
+fetcher = default_fetcher()
 
+# incremental syncs only pick up new releases, so every feature is fully synced again after this many seconds
+ADOPTX_FULL_SYNC_INTERVAL = 7 * 24 * 60 * 60
 
-def main():
-    print("Getting Adoptium Release Manifests ")
-    r = sess.get(ADOPTX_API_AVAILABLE_RELEASES.format(base_url=ADOPTIUM_API_BASE))
-    r.raise_for_status()
-
-    available = AdoptxAvailableReleases(**r.json())
-
-    available_releases_file = os.path.join(
-        UPSTREAM_DIR, ADOPTIUM_DIR, "available_releases.json"
-    )
-    available.write(available_releases_file)
 
-    for feature in available.available_releases:
-        print("Getting Manifests for Adoptium feature release:", feature)
+def fetch_adoptx_releases(
+    releases_url: Callable[..., str],
+    jvm_impl: AdoptxJvmImpl,
+    vendor: AdoptxVendor,
+    feature: int,
+    known: Collection[str] = (),
+) -> List[AdoptxRelease]:
+    """
+    Fetches the releases of a feature, newest first.
+    Stops at the first release in known, as everything after it is known already.
+    """
 
-        page_size = 10
+    def get_page(page: int):
+        query = AdoptxAPIFeatureReleasesQuery(
+            image_type=AdoptxImageType.Jre,
+            page_size=ADOPTX_API_MAX_PAGE_SIZE,
+            page=page,
+            jvm_impl=jvm_impl,
+            vendor=vendor,
+        )
+        api_call = releases_url(feature, query=query)
+        print("Fetching JRE Page:", page, api_call)
+        return fetcher.get(api_call)
 
-        releases_for_feature: list[AdoptxRelease] = []
+    releases_for_feature: list[AdoptxRelease] = []
+    with concurrent.futures.ThreadPoolExecutor(1) as prefetch:
         page = 0
+        next_page = prefetch.submit(get_page, page)
         while True:
-            query = AdoptxAPIFeatureReleasesQuery(
-                image_type=AdoptxImageType.Jre,
-                page_size=page_size,
-                page=page,
-                jvm_impl=AdoptxJvmImpl.Hotspot,
-                vendor=AdoptxVendor.Eclipse,
-            )
-            api_call = adoptiumAPIFeatureReleasesUrl(feature, query=query)
-            print("Fetching JRE Page:", page, api_call)
-            r_rls = sess.get(api_call)
+            r_rls = next_page.result()
             if r_rls.status_code == 404:
                 break
             else:
                 r_rls.raise_for_status()
 
-            releases = list(AdoptxRelease(**rls) for rls in r_rls.json())
-            releases_for_feature.extend(releases)
+            page_json = r_rls.json()
+            known_at = next(
+                (i for i, rls in enumerate(page_json) if rls["id"] in known), None
+            )
+            if known_at is not None:
+                releases_for_feature.extend(
+                    AdoptxRelease(**rls) for rls in page_json[:known_at]
+                )
+                break
+
+            full_page = len(page_json) == ADOPTX_API_MAX_PAGE_SIZE
+            if full_page:
+                # fetch the next page while this one is parsed
+                page += 1
+                next_page = prefetch.submit(get_page, page)
 
-            if len(r_rls.json()) < page_size:
+            releases_for_feature.extend(AdoptxRelease(**rls) for rls in page_json)
+            if not full_page:
                 break
-            page += 1
 
-        print("Total Adoptium releases for feature:", len(releases_for_feature))
-        releases = AdoptxReleases(__root__=releases_for_feature)
-        feature_file = os.path.join(
-            UPSTREAM_DIR, ADOPTIUM_VERSIONS_DIR, f"java{feature}.json"
+    return releases_for_feature
+
+
+def sync_adoptx_releases(
+    name: str,
+    versions_dir: str,
+    releases_url: Callable[..., str],
+    jvm_impl: AdoptxJvmImpl,
+    vendor: AdoptxVendor,
+    sync_times: JsonStore,
+    feature: int,
+) -> List[AdoptxRelease]:
+    feature_file = os.path.join(UPSTREAM_DIR, versions_dir, f"java{feature}.json")
+    sync_key = f"{name}/{feature}"
+    last_full_sync = sync_times.get(sync_key, 0)
+
+    stored: List[AdoptxRelease] = []
+    if (
+        os.path.isfile(feature_file)
+        and time.time() - last_full_sync < ADOPTX_FULL_SYNC_INTERVAL
+    ):
+        stored = AdoptxReleases.parse_file(feature_file).__root__
+
+    if stored:
+        print(f"Syncing new manifests for {name} feature release:", feature)
+        known = {rls.release_id for rls in stored}
+        new_releases = fetch_adoptx_releases(
+            releases_url, jvm_impl, vendor, feature, known
         )
-        releases.write(feature_file)
-
-    print("Getting OpenJ9 Release Manifests ")
-    r = sess.get(ADOPTX_API_AVAILABLE_RELEASES.format(base_url=OPENJ9_API_BASE))
+        releases_for_feature = new_releases + stored
+        print(f"New {name} releases for feature {feature}:", len(new_releases))
+    else:
+        print(f"Getting Manifests for {name} feature release:", feature)
+        releases_for_feature = fetch_adoptx_releases(
+            releases_url, jvm_impl, vendor, feature
+        )
+        sync_times.set(sync_key, time.time())
+
+    print(f"Total {name} releases for feature {feature}:", len(releases_for_feature))
+    return releases_for_feature
+
+
+def update_adoptx(
+    name: str,
+    api_base: str,
+    base_dir: str,
+    versions_dir: str,
+    releases_url: Callable[..., str],
+    jvm_impl: AdoptxJvmImpl,
+    vendor: AdoptxVendor,
+    skip_empty: bool = False,
+):
+    print(f"Getting {name} Release Manifests ")
+    r = fetcher.get(ADOPTX_API_AVAILABLE_RELEASES.format(base_url=api_base))
     r.raise_for_status()
 
     available = AdoptxAvailableReleases(**r.json())
 
     available_releases_file = os.path.join(
-        UPSTREAM_DIR, OPENJ9_DIR, "available_releases.json"
+        UPSTREAM_DIR, base_dir, "available_releases.json"
     )
     available.write(available_releases_file)
 
-    for feature in available.available_releases:
-        print("Getting Manifests for OpenJ9 feature release:", feature)
-
-        page_size = 10
-
-        releases_for_feature: list[AdoptxRelease] = []
-        page = 0
-        while True:
-            query = AdoptxAPIFeatureReleasesQuery(
-                image_type=AdoptxImageType.Jre,
-                page_size=page_size,
-                page=page,
-                jvm_impl=AdoptxJvmImpl.OpenJ9,
-                vendor=AdoptxVendor.Ibm,
-            )
-            api_call = openj9APIFeatureReleasesUrl(feature, query=query)
-            print("Fetching JRE Page:", page, api_call)
-            r_rls = sess.get(api_call)
-            if r_rls.status_code == 404:
-                break
-            else:
-                r_rls.raise_for_status()
-
-            releases = list(AdoptxRelease(**rls) for rls in r_rls.json())
-            releases_for_feature.extend(releases)
-
-            if len(r_rls.json()) < page_size:
-                break
-            page += 1
-
-        print("Total OpenJ9 releases for feature:", len(releases_for_feature))
-        releases = AdoptxReleases(__root__=releases_for_feature)
-        if len(releases_for_feature) == 0:
+    # all features are fetched concurrently, but come back in order
+    sync_times = JsonStore("adoptx_full_syncs")
+    features = available.available_releases
+    all_releases = fetcher.map(
+        partial(
+            sync_adoptx_releases,
+            name,
+            versions_dir,
+            releases_url,
+            jvm_impl,
+            vendor,
+            sync_times,
+        ),
+        features,
+    )
+    for feature, releases_for_feature in zip(features, all_releases):
+        if skip_empty and len(releases_for_feature) == 0:
             continue
-        feature_file = os.path.join(
-            UPSTREAM_DIR, OPENJ9_VERSIONS_DIR, f"java{feature}.json"
-        )
+        releases = AdoptxReleases(__root__=releases_for_feature)
+        feature_file = os.path.join(UPSTREAM_DIR, versions_dir, f"java{feature}.json")
         releases.write(feature_file)
+    sync_times.save()
+
+
+def fetch_azul_package_detail(package_uuid: str) -> ZuluPackageDetail:
+    api_call = azulApiPackageDetailUrl(package_uuid)
+    print("Fetching Azul package manifest:", package_uuid)
+    r_pkg = fetcher.get(api_call)
+    r_pkg.raise_for_status()
+    return ZuluPackageDetail(**r_pkg.json())
+
+
+def migrate_azul_details(details: ZuluPackageDetailIndex) -> List[str]:
+    """
+    Moves package details from the per package files used before into details.
+    Returns the files, which can be removed once details are written.
+    """
+    versions_dir = os.path.join(UPSTREAM_DIR, AZUL_VERSIONS_DIR)
+    migrated = []
+    for filename in os.listdir(versions_dir):
+        # leave the per major files alone
+        if not filename.endswith(".json") or filename.startswith("java"):
+            continue
+        pkg_file = os.path.join(versions_dir, filename)
+        if filename[: -len(".json")] not in details:
+            details.add(ZuluPackageDetail.parse_file(pkg_file))
+        migrated.append(pkg_file)
+    if migrated:
+        print("Migrated Azul package manifests:", len(migrated))
+    return migrated
+
+
+def main():
+    update_adoptx(
+        "Adoptium",
+        ADOPTIUM_API_BASE,
+        ADOPTIUM_DIR,
+        ADOPTIUM_VERSIONS_DIR,
+        adoptiumAPIFeatureReleasesUrl,
+        AdoptxJvmImpl.Hotspot,
+        AdoptxVendor.Eclipse,
+    )
+    update_adoptx(
+        "OpenJ9",
+        OPENJ9_API_BASE,
+        OPENJ9_DIR,
+        OPENJ9_VERSIONS_DIR,
+        openj9APIFeatureReleasesUrl,
+        AdoptxJvmImpl.OpenJ9,
+        AdoptxVendor.Ibm,
+        skip_empty=True,
+    )
 
     print("Getting Azul Release Manifests")
     zulu_packages: list[ZuluPackage] = []
@@ -170,7 +275,7 @@ def main():
 
         print("Processing Page:", page, api_call)
 
-        r = sess.get(api_call)
+        r = fetcher.get(api_call)
         if r.status_code == 404:
             break
         else:
@@ -187,35 +292,42 @@ def main():
     azul_manifest_file = os.path.join(UPSTREAM_DIR, AZUL_DIR, "packages.json")
     packages.write(azul_manifest_file)
 
+    details_file = os.path.join(UPSTREAM_DIR, AZUL_DETAILS_FILE)
+    if os.path.isfile(details_file):
+        details = ZuluPackageDetailIndex.parse_file_trusted(details_file)
+    else:
+        details = ZuluPackageDetailIndex(__root__={})
+    migrated = migrate_azul_details(details)
+
+    missing = list(
+        dict.fromkeys(
+            pkg.package_uuid for _, pkg in packages if pkg.package_uuid not in details
+        )
+    )
+    for pkg_detail in fetcher.map(fetch_azul_package_detail, missing):
+        details.add(pkg_detail)
+
+    if missing or migrated or not os.path.isfile(details_file):
+        details.write(details_file)
+        ZuluPackageDetailIndex.stamp_validated(details_file)
+    # only remove the old files once their details are stored
+    remove_files(migrated)
+
     azul_major_versions: dict[int, ZuluPackagesDetail] = {}
 
     for _, pkg in packages:
-
-        major_version = pkg.java_version[0]
+        pkg_detail = details[pkg.package_uuid]
+        major_version = pkg_detail.java_version[0]
         if major_version not in azul_major_versions:
             azul_major_versions[major_version] = ZuluPackagesDetail(__root__=[])
-
-        pkg_file = os.path.join(
-            UPSTREAM_DIR, AZUL_VERSIONS_DIR, f"{pkg.package_uuid}.json"
-        )
-        if os.path.exists(pkg_file) and os.path.isfile(pkg_file):
-            pkg_detail = ZuluPackageDetail.parse_file(pkg_file)
-            azul_major_versions[major_version].append(pkg_detail)
-        else:
-
-            api_call = azulApiPackageDetailUrl(pkg.package_uuid)
-            print("Fetching Azul package manifest:", pkg.package_uuid)
-            r_pkg = sess.get(api_call)
-            r_pkg.raise_for_status()
-
-            pkg_detail = ZuluPackageDetail(**r_pkg.json())
-            pkg_detail.write(pkg_file)
-            azul_major_versions[major_version].append(pkg_detail)
+        azul_major_versions[major_version].append(pkg_detail)
 
     for major in azul_major_versions:
         major_file = os.path.join(UPSTREAM_DIR, AZUL_VERSIONS_DIR, f"java{major}.json")
         azul_major_versions[major].write(major_file)
 
+    save_validation_stamps()
+
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,8 @@
 import json
 import os
 
-from meta.common import upstream_path, ensure_upstream_dir, default_session
+from meta.common import upstream_path, ensure_upstream_dir
+from meta.common.http import Revalidator, default_fetcher
 from meta.common.liteloader import VERSIONS_FILE, BASE_DIR
 from meta.model.liteloader import LiteloaderIndex
 
@@ -9,13 +10,21 @@ UPSTREAM_DIR = upstream_path()
 
 ensure_upstream_dir(BASE_DIR)
 
-sess = default_session()
+fetcher = default_fetcher()
+
+VERSIONS_URL = "http://dl.liteloader.com/versions/versions.json"
 
 
 def main():
+    revalidator = Revalidator(
+        fetcher, "liteloader", outputs=[os.path.join(UPSTREAM_DIR, VERSIONS_FILE)]
+    )
+    if revalidator.unchanged([VERSIONS_URL]):
+        print("LiteLoader is unchanged upstream, nothing to update")
+        return
+
     # get the remote version list
-    r = sess.get("http://dl.liteloader.com/versions/versions.json")
-    r.raise_for_status()
+    r = revalidator.get(VERSIONS_URL)
 
     # make sure it's JSON
     main_json = r.json()
@@ -31,6 +40,7 @@ def main():
 
     # save the json it to file
     remote_versions.write(os.path.join(UPSTREAM_DIR, VERSIONS_FILE))
+    revalidator.commit()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
-import concurrent.futures
 import json
 import os
 import zipfile
+from functools import partial
 
-from meta.common import upstream_path, ensure_upstream_dir, default_session
-from meta.common.http import download_binary_file
+from pydantic import ValidationError
+
+from meta.common import upstream_path, ensure_upstream_dir, eprint
+from meta.common.http import download_binary_file, Revalidator, default_fetcher
 from meta.common.mojang import (
     BASE_DIR,
     VERSION_MANIFEST_FILE,
@@ -14,7 +16,9 @@ from meta.common.mojang import (
     STATIC_OLD_SNAPSHOTS_FILE,
     JAVA_MANIFEST_FILE,
 )
+from meta.model import save_validation_stamps
 from meta.model.mojang import (
+    MojangVersion,
     MojangIndexWrap,
     MojangIndex,
     ExperimentIndex,
@@ -30,12 +34,22 @@ ensure_upstream_dir(BASE_DIR)
 ensure_upstream_dir(VERSIONS_DIR)
 ensure_upstream_dir(ASSETS_DIR)
 
-sess = default_session()
+fetcher = default_fetcher()
+
+
+def stamp_version(path):
+    # validate new version files once here, so generators can load them without validation
+    try:
+        MojangVersion.parse_file(path)
+    except ValidationError as e:
+        eprint(f"Version file {path} doesn't validate: {e}")
+        return
+    MojangVersion.stamp_validated(path)
 
 
 def fetch_zipped_version(path, url):
     zip_path = f"{path}.zip"
-    download_binary_file(sess, zip_path, url)
+    download_binary_file(fetcher, zip_path, url)
     with zipfile.ZipFile(zip_path) as z:
         for info in z.infolist():
             if info.filename.endswith(".json"):
@@ -49,12 +63,13 @@ def fetch_zipped_version(path, url):
 
     with open(path, "w", encoding="utf-8") as f:
         json.dump(version_json, f, sort_keys=True, indent=4)
+    stamp_version(path)
 
     return version_json
 
 
 def fetch_modified_version(path, version):
-    r = sess.get(version.url)
+    r = fetcher.get(version.url)
     r.raise_for_status()
     version_json = r.json()
 
@@ -70,27 +85,29 @@ def fetch_modified_version(path, version):
 
     with open(path, "w", encoding="utf-8") as f:
         json.dump(version_json, f, sort_keys=True, indent=4)
+    stamp_version(path)
 
     return version_json
 
 
 def fetch_version(path, url):
-    r = sess.get(url)
+    r = fetcher.get(url)
     r.raise_for_status()
     version_json = r.json()
 
     with open(path, "w", encoding="utf-8") as f:
         json.dump(version_json, f, sort_keys=True, indent=4)
+    stamp_version(path)
 
     return version_json
 
 
+VERSION_MANIFEST_URL = "https://piston-meta.mojang.com/mc/game/version_manifest_v2.json"
 MOJANG_JAVA_URL = "https://piston-meta.mojang.com/v1/products/java-runtime/2ec0cc96c44e5a76b9c8b7c39df7210883d12871/all.json"
 
 
-def update_javas():
-    r = sess.get(MOJANG_JAVA_URL)
-    r.raise_for_status()
+def update_javas(revalidator: Revalidator):
+    r = revalidator.get(MOJANG_JAVA_URL)
 
     remote_javas = JavaIndex(__root__=r.json())
 
@@ -122,15 +139,23 @@ def fetch_modified_version_concurrent(old_snapshots, x):
 
 
 def main():
+    version_manifest_path = os.path.join(UPSTREAM_DIR, VERSION_MANIFEST_FILE)
+    revalidator = Revalidator(
+        fetcher,
+        "mojang",
+        outputs=[version_manifest_path, os.path.join(UPSTREAM_DIR, JAVA_MANIFEST_FILE)],
+        static_inputs=[STATIC_EXPERIMENTS_FILE, STATIC_OLD_SNAPSHOTS_FILE],
+    )
+    if revalidator.unchanged([VERSION_MANIFEST_URL, MOJANG_JAVA_URL]):
+        print("Minecraft is unchanged upstream, nothing to update")
+        return
+
     # get the remote version list
-    r = sess.get("https://piston-meta.mojang.com/mc/game/version_manifest_v2.json")
-    r.raise_for_status()
+    r = revalidator.get(VERSION_MANIFEST_URL)
 
     remote_versions = MojangIndexWrap(MojangIndex(**r.json()))
     remote_ids = set(remote_versions.versions.keys())
 
-    version_manifest_path = os.path.join(UPSTREAM_DIR, VERSION_MANIFEST_FILE)
-
     if os.path.exists(version_manifest_path):
         # get the local version list
         current_versions = MojangIndexWrap(
@@ -149,13 +174,10 @@ def main():
     else:
         pending_ids = remote_ids
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [
-            executor.submit(fetch_version_concurrent, remote_versions, x)
-            for x in pending_ids
-        ]
-        for f in futures:
-            f.result()
+    for _ in fetcher.map(
+        partial(fetch_version_concurrent, remote_versions), pending_ids
+    ):
+        pass
 
     # deal with experimental snapshots separately
     if os.path.exists(STATIC_EXPERIMENTS_FILE):
@@ -181,18 +203,18 @@ def main():
         )
         old_snapshots_ids = set(old_snapshots.versions.keys())
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(fetch_modified_version_concurrent, old_snapshots, x)
-                for x in old_snapshots_ids
-            ]
-            for f in futures:
-                f.result()
+        for _ in fetcher.map(
+            partial(fetch_modified_version_concurrent, old_snapshots), old_snapshots_ids
+        ):
+            pass
 
     remote_versions.index.write(version_manifest_path)
 
     print("Getting Mojang Java runtime manfest")
-    update_javas()
+    update_javas(revalidator)
+
+    save_validation_stamps()
+    revalidator.commit()
 
 
 if __name__ == "__main__":
@@ -2,14 +2,12 @@
 Get the source files necessary for generating Forge versions
 """
 
-import concurrent.futures
 import copy
-import hashlib
 import json
 import os
 import re
 import zipfile
-from contextlib import suppress
+from contextlib import nullcontext, suppress
 from datetime import datetime
 from pathlib import Path
 from pprint import pprint
@@ -20,13 +18,18 @@ from pydantic import ValidationError
 from meta.common import (
     upstream_path,
     ensure_upstream_dir,
-    default_session,
     remove_files,
     eprint,
-    file_hash,
     get_file_sha1_from_file,
 )
-from meta.common.http import download_binary_file
+from meta.common.http import (
+    default_fetcher,
+    download_binary_file,
+    fetch_checksum,
+    RangeRequestsUnsupported,
+    RemoteZipFile,
+    Revalidator,
+)
 from meta.common.neoforge import (
     JARS_DIR,
     INSTALLER_INFO_DIR,
@@ -43,6 +46,8 @@ from meta.model.neoforge import (
     NeoForgeInstallerProfileV2,
     InstallerInfo,
 )
+from meta.common.store import file_digests, save_file_digests
+from meta.model import save_validation_stamps
 from meta.model.mojang import MojangVersion
 
 UPSTREAM_DIR = upstream_path()
@@ -53,7 +58,14 @@ ensure_upstream_dir(INSTALLER_MANIFEST_DIR)
 ensure_upstream_dir(VERSION_MANIFEST_DIR)
 ensure_upstream_dir(FILE_MANIFEST_DIR)
 
-sess = default_session()
+fetcher = default_fetcher()
+
+FORGE_VERSIONS_URL = (
+    "https://maven.neoforged.net/api/maven/versions/releases/net%2Fneoforged%2Fforge"
+)
+NEOFORGE_VERSIONS_URL = (
+    "https://maven.neoforged.net/api/maven/versions/releases/net%2Fneoforged%2Fneoforge"
+)
 
 
 def find_nth(haystack, needle, n):
@@ -78,7 +90,7 @@ def get_single_forge_files_manifest(longversion, artifact: str):
             f"https://maven.neoforged.net/api/maven/details/releases/net%2Fneoforged%2F{artifact}%2F"
             + urllib.parse.quote(longversion)
         )
-        r = sess.get(file_url)
+        r = fetcher.get(file_url)
         r.raise_for_status()
         files_json = r.json()
 
@@ -143,7 +155,7 @@ def process_neoforge_version(key, entry):
     sha1_file = jar_path + ".sha1"
     fileSha1 = get_file_sha1_from_file(jar_path, sha1_file)
     try:
-        rfile = sess.get(version.url() + ".sha1")
+        rfile = fetcher.get(version.url() + ".sha1")
         rfile.raise_for_status()
         new_sha1 = rfile.text.strip()
         if fileSha1 != new_sha1:
@@ -156,20 +168,32 @@ def process_neoforge_version(key, entry):
         installer_info_path
     )
 
+    installer = None
+    downloaded = None
     if installer_refresh_required:
         # grab the installer if it's not there
         if not os.path.isfile(jar_path):
-            eprint("Downloading %s" % version.url())
             try:
-                Path(jar_path).parent.mkdir(parents=True, exist_ok=True)
-                download_binary_file(sess, jar_path, version.url())
+                # only what's needed gets downloaded, if the server supports it
+                installer = RemoteZipFile(fetcher, version.url())
+            except RangeRequestsUnsupported:
+                installer = None
             except Exception as e:
-                eprint("Failed to download %s" % version.url())
+                eprint("Failed to read %s" % version.url())
                 eprint("Error is %s" % e)
                 return
+            if installer is None:
+                eprint("Downloading %s" % version.url())
+                try:
+                    Path(jar_path).parent.mkdir(parents=True, exist_ok=True)
+                    downloaded = download_binary_file(fetcher, jar_path, version.url())
+                except Exception as e:
+                    eprint("Failed to download %s" % version.url())
+                    eprint("Error is %s" % e)
+                    return
             if new_sha1 is None:
                 try:
-                    rfile = sess.get(version.url() + ".sha1")
+                    rfile = fetcher.get(version.url() + ".sha1")
                     rfile.raise_for_status()
                     new_sha1 = rfile.text.strip()
                 except Exception as e:
@@ -179,73 +203,101 @@ def process_neoforge_version(key, entry):
                 with open(sha1_file, "w") as file:
                     file.write(new_sha1)
 
-    eprint("Processing %s" % version.url())
-    # harvestables from the installer
-    if not os.path.isfile(profile_path):
-        print(jar_path)
-        with zipfile.ZipFile(jar_path) as jar:
-            with suppress(KeyError):
-                with jar.open("version.json") as profile_zip_entry:
-                    version_data = profile_zip_entry.read()
-
-                    # Process: does it parse?
-                    MojangVersion.parse_raw(version_data)
-
-                    Path(version_file_path).parent.mkdir(parents=True, exist_ok=True)
-                    with open(version_file_path, "wb") as versionJsonFile:
-                        versionJsonFile.write(version_data)
-                        versionJsonFile.close()
-
-            with jar.open("install_profile.json") as profile_zip_entry:
-                install_profile_data = profile_zip_entry.read()
-
-                # Process: does it parse?
-                is_parsable = False
-                exception = None
-                try:
-                    NeoForgeInstallerProfileV2.parse_raw(install_profile_data)
-                    is_parsable = True
-                except ValidationError as err:
-                    exception = err
-
-                if not is_parsable:
-                    if version.is_supported():
-                        raise exception
-                    else:
-                        eprint(
-                            "Version %s is not supported and won't be generated later."
-                            % version.long_version
+    # closes the remote installer on every path, not just after harvesting it
+    with installer or nullcontext():
+        eprint("Processing %s" % version.url())
+        # harvestables from the installer
+        if not os.path.isfile(profile_path):
+            print(jar_path)
+            with installer or zipfile.ZipFile(jar_path) as jar:
+                with suppress(KeyError):
+                    with jar.open("version.json") as profile_zip_entry:
+                        version_data = profile_zip_entry.read()
+
+                        # Process: does it parse?
+                        MojangVersion.parse_raw(version_data)
+
+                        Path(version_file_path).parent.mkdir(
+                            parents=True, exist_ok=True
                         )
+                        with open(version_file_path, "wb") as versionJsonFile:
+                            versionJsonFile.write(version_data)
+                            versionJsonFile.close()
+                        MojangVersion.stamp_validated(version_file_path)
 
-                Path(profile_path).parent.mkdir(parents=True, exist_ok=True)
-                with open(profile_path, "wb") as profileFile:
-                    profileFile.write(install_profile_data)
-                    profileFile.close()
+                with jar.open("install_profile.json") as profile_zip_entry:
+                    install_profile_data = profile_zip_entry.read()
 
-    # installer info v1
-    if not os.path.isfile(installer_info_path):
-        installer_info = InstallerInfo()
-        installer_info.sha1hash = file_hash(jar_path, hashlib.sha1)
-        installer_info.sha256hash = file_hash(jar_path, hashlib.sha256)
-        installer_info.size = os.path.getsize(jar_path)
-        installer_info.write(installer_info_path)
+                    # Process: does it parse?
+                    is_parsable = False
+                    exception = None
+                    try:
+                        NeoForgeInstallerProfileV2.parse_raw(install_profile_data)
+                        is_parsable = True
+                    except ValidationError as err:
+                        exception = err
+
+                    if not is_parsable:
+                        if version.is_supported():
+                            raise exception
+                        else:
+                            eprint(
+                                "Version %s is not supported and won't be generated later."
+                                % version.long_version
+                            )
+
+                    Path(profile_path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(profile_path, "wb") as profileFile:
+                        profileFile.write(install_profile_data)
+                        profileFile.close()
+                    if is_parsable:
+                        NeoForgeInstallerProfileV2.stamp_validated(profile_path)
+
+        # installer info v1
+        if not os.path.isfile(installer_info_path):
+            installer_info = InstallerInfo()
+            if installer is not None:
+                # the maven publishes the checksums of the installer next to it
+                installer_info.sha1hash = new_sha1
+                installer_info.sha256hash = fetch_checksum(
+                    fetcher, version.url() + ".sha256"
+                )
+                installer_info.size = installer.size
+            if not installer_info.sha1hash or not installer_info.sha256hash:
+                if not os.path.isfile(jar_path):
+                    eprint("Downloading %s" % version.url())
+                    downloaded = download_binary_file(fetcher, jar_path, version.url())
+                if downloaded is not None:
+                    installer_info.sha1hash = downloaded.sha1
+                    installer_info.sha256hash = downloaded.sha256
+                    installer_info.size = downloaded.size
+                else:
+                    digests = file_digests(jar_path)
+                    installer_info.sha1hash = digests["sha1"]
+                    installer_info.sha256hash = digests["sha256"]
+                    installer_info.size = os.path.getsize(jar_path)
+            installer_info.write(installer_info_path)
 
 
 def main():
-    # get the 1.20.1 remote version list fragments
-    r = sess.get(
-        "https://maven.neoforged.net/api/maven/versions/releases/net%2Fneoforged%2Fforge"
+    revalidator = Revalidator(
+        fetcher,
+        "neoforge",
+        outputs=[
+            UPSTREAM_DIR + "/neoforge/maven-metadata.json",
+            UPSTREAM_DIR + "/neoforge/derived_index.json",
+        ],
     )
-    r.raise_for_status()
-    main_json = r.json()["versions"]
+    if revalidator.unchanged([FORGE_VERSIONS_URL, NEOFORGE_VERSIONS_URL]):
+        print("NeoForge is unchanged upstream, nothing to update")
+        return
+
+    # get the 1.20.1 remote version list fragments
+    main_json = revalidator.get(FORGE_VERSIONS_URL).json()["versions"]
     assert type(main_json) == list
 
     # get the new remote version list fragments
-    r = sess.get(
-        "https://maven.neoforged.net/api/maven/versions/releases/net%2Fneoforged%2Fneoforge"
-    )
-    r.raise_for_status()
-    new_main_json = r.json()["versions"]
+    new_main_json = revalidator.get(NEOFORGE_VERSIONS_URL).json()["versions"]
     assert type(new_main_json) == list
 
     main_json += new_main_json
@@ -304,13 +356,14 @@ def main():
 
     print("Grabbing installers and dumping installer profiles...")
     # get the installer jars - if needed - and get the installer profiles out of them
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [
-            executor.submit(process_neoforge_version, key, entry)
-            for key, entry in new_index.versions.items()
-        ]
-        for f in futures:
-            f.result()
+    for _ in fetcher.map(
+        lambda item: process_neoforge_version(*item), new_index.versions.items()
+    ):
+        pass
+
+    save_validation_stamps()
+    save_file_digests()
+    revalidator.commit()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,15 @@
-import concurrent.futures
 import json
 import os
 import zipfile
+from functools import partial
 from datetime import datetime
 
 from meta.common import (
     upstream_path,
     ensure_upstream_dir,
     transform_maven_key,
-    default_session,
 )
+from meta.common.http import Revalidator, default_fetcher, download_binary_file
 from meta.common.quilt import JARS_DIR, INSTALLER_INFO_DIR, META_DIR, USE_QUILT_MAPPINGS
 from meta.model.fabric import FabricJarInfo
 
@@ -19,7 +19,7 @@ ensure_upstream_dir(JARS_DIR)
 ensure_upstream_dir(INSTALLER_INFO_DIR)
 ensure_upstream_dir(META_DIR)
 
-sess = default_session()
+fetcher = default_fetcher()
 
 
 def get_maven_url(maven_key, server, ext):
@@ -31,9 +31,9 @@ def get_maven_url(maven_key, server, ext):
     return maven_url
 
 
-def get_json_file(path, url):
+def get_json_file(path, url, get=None):
     with open(path, "w", encoding="utf-8") as f:
-        r = sess.get(url)
+        r = (get or fetcher.get)(url)
         r.raise_for_status()
         print(f"QUILT DEBUG {r.headers}")
         version_json = r.json()
@@ -42,24 +42,16 @@ def get_json_file(path, url):
 
 
 def head_file(url):
-    r = sess.head(url)
+    r = fetcher.head(url)
     r.raise_for_status()
     return r.headers
 
 
-def get_binary_file(path, url):
-    with open(path, "wb") as f:
-        r = sess.get(url)
-        r.raise_for_status()
-        for chunk in r.iter_content(chunk_size=128):
-            f.write(chunk)
-
-
 def compute_jar_file(path, url):
     # NOTE: Quilt Meta does not make any guarantees about Last-Modified.
     # Always download the JAR file instead
     jar_path = path + ".jar"
-    get_binary_file(jar_path, url)
+    download_binary_file(fetcher, jar_path, url)
     tstamp = datetime.fromtimestamp(0)
     with zipfile.ZipFile(jar_path) as jar:
         allinfo = jar.infolist()
@@ -100,31 +92,41 @@ def main():
     components = ["loader"]
     if USE_QUILT_MAPPINGS:
         components.append("hashed")
+    revalidator = Revalidator(
+        fetcher,
+        "quilt",
+        outputs=[
+            os.path.join(UPSTREAM_DIR, META_DIR, f"{component}.json")
+            for component in components
+        ],
+    )
+    if revalidator.unchanged(
+        [
+            "https://meta.quiltmc.org/v3/versions/" + component
+            for component in components
+        ]
+    ):
+        print("Quilt is unchanged upstream, nothing to update")
+        return
+
     for component in components:
         index = get_json_file(
             os.path.join(UPSTREAM_DIR, META_DIR, f"{component}.json"),
             "https://meta.quiltmc.org/v3/versions/" + component,
+            revalidator.get,
         )
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(compute_jar_file_concurrent, component, it)
-                for it in index
-            ]
-            for f in futures:
-                f.result()
+        for _ in fetcher.map(partial(compute_jar_file_concurrent, component), index):
+            pass
 
     # for each loader, download installer JSON file from maven
     with open(
         os.path.join(UPSTREAM_DIR, META_DIR, "loader.json"), "r", encoding="utf-8"
     ) as loaderVersionIndexFile:
         loader_version_index = json.load(loaderVersionIndexFile)
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(get_json_file_concurrent, it)
-                for it in loader_version_index
-            ]
-            for f in futures:
-                f.result()
+        for _ in fetcher.map(get_json_file_concurrent, loader_version_index):
+            pass
+
+    revalidator.commit()
 
 
 if __name__ == "__main__":
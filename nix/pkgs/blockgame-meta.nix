@@ -8,6 +8,7 @@
   filelock,
   git,
   openssh,
+  orjson,
   packaging,
   pydantic_1,
   python,
@@ -44,6 +45,7 @@ buildPythonApplication {
     cachecontrol
     requests
     filelock
+    orjson
     packaging
     pydantic_1
   ];
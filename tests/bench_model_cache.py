@@ -0,0 +1,72 @@
+"""
+Times reading a version written earlier in the same process, with and without the model cache.
+Run with: PYTHONPATH=. python tests/bench_model_cache.py
+"""
+
+import copy
+import os
+import tempfile
+import timeit
+
+import meta.model
+from meta.model import MetaVersion, enable_model_cache
+
+
+def _version() -> MetaVersion:
+    return MetaVersion(
+        name="Minecraft",
+        version="1.20.2",
+        uid="net.minecraft",
+        releaseTime="2023-09-20T09:02:57+00:00",
+        mainClass="net.minecraft.client.main.Main",
+        libraries=[
+            {
+                "name": f"org.example.group{i}:artifact{i}:1.{i}.0",
+                "downloads": {
+                    "artifact": {
+                        "sha1": "0" * 40,
+                        "size": 1000 + i,
+                        "url": f"https://libraries.minecraft.net/org/example/artifact{i}.jar",
+                    }
+                },
+                "rules": [{"action": "allow", "os": {"name": "linux"}}],
+            }
+            for i in range(60)
+        ],
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # validation stamps go to the cache directory
+        os.environ["META_CACHE_DIR"] = directory
+        path = os.path.join(directory, "1.20.2.json")
+        number = 200
+
+        meta.model._model_cache = None
+        _version().write(path)
+        parse = timeit.timeit(lambda: MetaVersion.parse_file(path), number=number)
+        MetaVersion.stamp_validated(path)
+        trusted = timeit.timeit(
+            lambda: MetaVersion.parse_file_trusted(path), number=number
+        )
+
+        enable_model_cache([directory])
+        _version().write(path)
+        hit = timeit.timeit(lambda: MetaVersion.parse_file(path), number=number)
+        # what a reader that has to change the model pays on top
+        copied = timeit.timeit(
+            lambda: copy.deepcopy(MetaVersion.parse_file(path)), number=number
+        )
+
+        for name, total in [
+            ("parse_file", parse),
+            ("parse_file_trusted", trusted),
+            ("cache hit", hit),
+            ("cache hit + deepcopy", copied),
+        ]:
+            print(f"{name:>20}: {total / number * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
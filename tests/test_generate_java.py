@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+from meta.model.java import (
+    JavaPackageType,
+    JavaRuntimeCatalogue,
+    JavaRuntimeDownloadType,
+    JavaRuntimeMeta,
+    JavaRuntimeOS,
+    JavaVersionMeta,
+)
+from meta.model.mojang import MojangJavaComponent
+from meta.run.generate_java import get_mojang_extra_java
+
+
+def _runtime(vendor, major, runtime_os):
+    return JavaRuntimeMeta(
+        name=f"{vendor}_jre{major}",
+        vendor=vendor,
+        url=f"https://example.com/{vendor}/{major}.tar.gz",
+        releaseTime=datetime(2024, 1, 16, tzinfo=timezone.utc),
+        downloadType=JavaRuntimeDownloadType.Archive,
+        packageType=JavaPackageType.Jre,
+        version=JavaVersionMeta(major=major, minor=0, security=10),
+        runtimeOS=runtime_os,
+    )
+
+
+def test_borrowed_runtimes_are_named_per_component():
+    catalogue = JavaRuntimeCatalogue()
+    adoptium = _runtime("eclipse", 17, JavaRuntimeOS.LinuxArm64)
+    catalogue.add(adoptium, 17)
+    catalogue.add(_runtime("azul", 17, JavaRuntimeOS.LinuxArm64), 17)
+
+    components = [
+        MojangJavaComponent.Alpha,
+        MojangJavaComponent.Beta,
+        MojangJavaComponent.Gamma,
+        MojangJavaComponent.GammaSnapshot,
+    ]
+    runtimes = [
+        get_mojang_extra_java(catalogue, component, JavaRuntimeOS.LinuxArm64)
+        for component in components
+    ]
+
+    assert [runtime.name for runtime in runtimes] == [
+        "java-runtime-alpha",
+        "java-runtime-beta",
+        "java-runtime-gamma",
+        "java-runtime-gamma-snapshot",
+    ]
+    assert all(runtime.vendor == "eclipse" for runtime in runtimes)
+    # the vendor's own entry keeps its name
+    assert adoptium.name == "eclipse_jre17"
+    assert (
+        get_mojang_extra_java(
+            catalogue, MojangJavaComponent.Delta, JavaRuntimeOS.LinuxArm64
+        )
+        is None
+    )
@@ -0,0 +1,210 @@
+import io
+import threading
+import zipfile
+
+import pytest
+import requests
+
+from meta.common import http
+from meta.common.http import ConcurrentFetcher, RemoteZipFile, Revalidator
+
+
+class StubResponse:
+    def __init__(self, status_code=200, headers=None, content=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+
+class StubSession:
+    """
+    Answers requests from a script of responses and exceptions, recording what was asked for.
+    """
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        result = self.script.pop(0) if self.script else StubResponse()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(http.time, "sleep", delays.append)
+    return delays
+
+
+def test_retries_server_errors(sleeps):
+    ok = StubResponse(200)
+    busy = StubResponse(503)
+    sess = StubSession([busy, StubResponse(502), ok])
+    fetcher = ConcurrentFetcher(sess, retries=3, backoff=0.5)
+
+    assert fetcher.get("https://example.com/a") is ok
+    assert len(sess.calls) == 3
+    assert busy.closed
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_after(sleeps):
+    sess = StubSession([StubResponse(429, {"Retry-After": "7"}), StubResponse(200)])
+    fetcher = ConcurrentFetcher(sess, backoff=0.5)
+
+    assert fetcher.get("https://example.com/a").status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_retries_connection_errors(sleeps):
+    sess = StubSession(
+        [requests.ConnectionError("reset"), requests.Timeout("slow"), StubResponse()]
+    )
+    fetcher = ConcurrentFetcher(sess, retries=2, backoff=1.0)
+
+    assert fetcher.get("https://example.com/a").status_code == 200
+    assert sleeps == [1.0, 2.0]
+
+
+def test_gives_up(sleeps):
+    sess = StubSession([StubResponse(503)] * 3)
+    fetcher = ConcurrentFetcher(sess, retries=2, backoff=1.0)
+    # the last response is returned as is, for raise_for_status to handle
+    assert fetcher.get("https://example.com/a").status_code == 503
+    assert len(sess.calls) == 3
+
+    sess = StubSession([requests.ConnectionError("reset")] * 3)
+    fetcher = ConcurrentFetcher(sess, retries=2, backoff=1.0)
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get("https://example.com/a")
+    assert len(sess.calls) == 3
+
+
+def test_no_retry_on_client_errors(sleeps):
+    sess = StubSession([StubResponse(404)])
+    fetcher = ConcurrentFetcher(sess)
+
+    assert fetcher.get("https://example.com/a").status_code == 404
+    assert len(sess.calls) == 1
+    assert sleeps == []
+
+
+def test_head_does_not_follow_redirects():
+    sess = StubSession()
+    fetcher = ConcurrentFetcher(sess)
+
+    fetcher.head("https://example.com/a")
+    fetcher.head("https://example.com/b", allow_redirects=True)
+    assert sess.calls == [
+        ("HEAD", "https://example.com/a", {"allow_redirects": False}),
+        ("HEAD", "https://example.com/b", {"allow_redirects": True}),
+    ]
+
+
+class ConcurrencySession:
+    """
+    Holds every request for a moment, tracking how many were in flight at once, overall and per host.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.total = 0
+        self.peak_total = 0
+
+    def request(self, method, url, **kwargs):
+        host = url.split("/")[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.total += 1
+            self.peak_total = max(self.peak_total, self.total)
+        threading.Event().wait(0.02)
+        with self.lock:
+            self.active[host] -= 1
+            self.total -= 1
+        return StubResponse()
+
+
+def test_per_host_limit():
+    sess = ConcurrencySession()
+    fetcher = ConcurrentFetcher(sess, max_workers=16, max_per_host=2, max_in_flight=3)
+    urls = [f"https://{host}/{i}" for i in range(8) for host in ("a.test", "b.test")]
+
+    results = list(fetcher.map(fetcher.get, urls))
+    assert len(results) == len(urls)
+    assert sess.peak == {"a.test": 2, "b.test": 2}
+    assert sess.peak_total == 3
+
+
+def test_revalidator_bypasses_http_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("META_CACHE_DIR", str(tmp_path))
+    uncached = StubSession(
+        [StubResponse(200, {"ETag": '"1"'}, b"{}"), StubResponse(304)]
+    )
+    monkeypatch.setattr(http, "uncached_session", lambda: uncached)
+    cached = StubSession()
+    url = "https://example.com/versions"
+
+    revalidator = Revalidator(cached, "test")
+    revalidator.store.set("static", revalidator.static_fingerprint)
+    revalidator.store.set(url, {"etag": '"0"', "last_modified": None, "sha256": ""})
+    assert not revalidator.unchanged([url])
+    assert revalidator.get(url).content == b"{}"
+    revalidator.commit()
+
+    revalidator = Revalidator(cached, "test")
+    assert revalidator.unchanged([url])
+    assert uncached.calls[1][2]["headers"] == {"If-None-Match": '"1"'}
+    assert cached.calls == []
+
+
+class RangeSession:
+    """
+    Serves byte ranges of one file.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, url, headers=None, **kwargs):
+        byte_range = headers["Range"][len("bytes=") :]
+        start, end = byte_range.split("-")
+        if not start:
+            start, end = max(len(self.data) - int(end), 0), len(self.data) - 1
+        start, end = int(start), int(end)
+        return StubResponse(
+            206,
+            {"Content-Range": f"bytes {start}-{end}/{len(self.data)}"},
+            self.data[start : end + 1],
+        )
+
+
+def test_remote_zip_file_closes_its_reader():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("install_profile.json", "{}")
+
+    with RemoteZipFile(
+        RangeSession(buffer.getvalue()), "https://example.com/a.jar"
+    ) as jar:
+        assert jar.read("install_profile.json") == b"{}"
+        assert jar.size == len(buffer.getvalue())
+    assert jar.reader.closed
+    jar.close()
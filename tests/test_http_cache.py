@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from meta.common.http_cache import BoundedFileCache
+
+
+@pytest.fixture
+def new_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("META_CACHE_DIR", str(tmp_path))
+    return lambda: BoundedFileCache(str(tmp_path / "http_cache"))
+
+
+def test_lookups_leave_index_alone(new_cache):
+    cache = new_cache()
+    cache.set("https://example.com/a", b"a" * 10)
+    cache.save()
+
+    for _ in range(300):
+        assert cache.get("https://example.com/a") == b"a" * 10
+    assert cache.index.changes == {}
+    assert cache.unsaved == 0
+
+
+def test_totals_follow_other_writers(new_cache):
+    first = new_cache()
+    second = new_cache()
+    first.set("https://example.com/a", b"a" * 10)
+    second.set("https://example.com/b", b"b" * 20)
+    second.save()
+    first.save()
+
+    assert first.totals == [30, 0]
+    assert len(first.index.data) == 2
+
+
+def test_empty_rebuild_is_saved(new_cache, monkeypatch):
+    cache = new_cache()
+    assert os.path.exists(cache.index.path)
+
+    monkeypatch.setattr(
+        BoundedFileCache, "_rebuild_index", lambda self: pytest.fail("rebuilt")
+    )
+    new_cache()
+
+
+def test_index_belongs_to_the_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("META_CACHE_DIR", str(tmp_path))
+    first = BoundedFileCache(str(tmp_path / "first"))
+    second = BoundedFileCache(str(tmp_path / "second"))
+    first.set("https://example.com/a", b"a" * 10)
+    first.save()
+
+    assert first.index.path != second.index.path
+    assert BoundedFileCache(str(tmp_path / "second")).index.data == {}
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+import meta.model
+from meta.model import MetaVersion, enable_model_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("META_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(meta.model, "_model_cache", None)
+    monkeypatch.setattr(meta.model, "_model_cache_paths", [])
+    directory = tmp_path / "net.minecraft"
+    enable_model_cache([str(directory)])
+    return directory
+
+
+def _version(version: str) -> MetaVersion:
+    return MetaVersion(name="Minecraft", version=version, uid="net.minecraft")
+
+
+def test_readers_share_the_written_model(cache_dir):
+    path = str(cache_dir / "1.20.2.json")
+    written = _version("1.20.2")
+    written.write(path)
+
+    assert MetaVersion.parse_file(path) is written
+    assert MetaVersion.parse_file_trusted(path) is written
+
+
+def test_changed_files_are_parsed_again(cache_dir):
+    path = str(cache_dir / "1.20.2.json")
+    written = _version("1.20.2")
+    written.write(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_version("1.20.3").json())
+    os.utime(path, ns=(0, 0))
+
+    parsed = MetaVersion.parse_file(path)
+    assert parsed is not written
+    assert parsed.version == "1.20.3"
+
+
+def test_other_paths_are_not_cached(cache_dir, tmp_path):
+    path = str(tmp_path / "elsewhere.json")
+    written = _version("1.20.2")
+    written.write(path)
+
+    assert MetaVersion.parse_file(path) is not written
@@ -0,0 +1,117 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from meta.common import serialization
+from meta.model import MetaVersion
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "data", "serialization")
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(obj)
+
+
+CASES = {
+    "plain": {
+        "name": "Minecraft",
+        "uid": "net.minecraft",
+        "order": -2,
+        "volatile": False,
+        "requires": [{"uid": "org.lwjgl3", "suggests": "3.3.3"}],
+        "nothing": None,
+    },
+    "unicode": {
+        "ascii": "abc",
+        "latin": "Fabric Loader für Minecraft",
+        "cjk": "我的世界",
+        "astral": "\U0001f600 \U00010348",
+        "control": "\x00\x01\x1f\x7f\x80 ",
+        "escapes": '"quoted" \\ / \n\r\t\b\f',
+        "ключ": "значение",
+    },
+    "numbers": {
+        "zero": 0,
+        "negative": -42,
+        "int64": 2**63 - 1,
+        "big": 2**64,
+        "huge": -(10**40),
+        "floats": [0.1, 1.0, -0.0, 1e100, 1.5e-7, 123456789.125],
+        "bool": True,
+    },
+    "non_finite": {
+        "nan": float("nan"),
+        "inf": float("inf"),
+        "negative_inf": float("-inf"),
+        "null": None,
+    },
+    "empty": {
+        "dict": {},
+        "list": [],
+        "string": "",
+        "nested": [{}, [], [[]], {"a": {}}],
+    },
+    "keys": {1: "one", 10: "ten", 2: "two", "1a": "string"},
+    "tuples": {"tuple": (1, "two", (3,)), "list_of_tuples": [(), ("a",)]},
+    "default": {
+        "time": datetime(2023, 9, 12, 11, 5, 0, tzinfo=timezone.utc),
+        "times": [datetime(2009, 5, 13, 20, 11)],
+        "null": None,
+    },
+}
+
+KWARGS = {
+    "sorted": {"sort_keys": True, "indent": 4},
+    "unsorted": {"sort_keys": False, "indent": 4},
+    "compact": {"sort_keys": True},
+}
+
+
+def _golden(name, style):
+    with open(os.path.join(GOLDEN_DIR, f"{name}.{style}.json"), "rb") as f:
+        return f.read().decode("utf-8")
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(serialization, "BACKEND", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("style", KWARGS)
+@pytest.mark.parametrize("name", CASES)
+def test_matches_golden(backend, name, style):
+    obj = CASES[name]
+    kwargs = KWARGS[style]
+    if name == "keys" and kwargs["sort_keys"]:
+        pytest.skip("json.dumps can't sort mixed keys")
+
+    expected = json.dumps(obj, default=_default, **kwargs)
+    assert expected == _golden(name, style)
+    assert serialization.dumps(obj, default=_default, **kwargs) == expected
+
+
+def test_model_json(backend):
+    version = MetaVersion(
+        name="Minecraft",
+        version="1.20.2",
+        uid="net.minecraft",
+        releaseTime=datetime(2023, 9, 20, 9, 2, 57, tzinfo=timezone.utc),
+        requires=[{"uid": "org.lwjgl3", "suggests": "3.3.2"}],
+        libraries=[{"name": "com.mojang:blocklist:1.0.10"}],
+        **{"+traits": ["FirstThreadOnMacOS"]},
+    )
+    assert version.json() == _golden("model", "sorted")
+
+
+def test_non_finite_falls_back():
+    pytest.importorskip("orjson")
+    obj = {"value": float("nan")}
+    assert serialization._orjson_dumps(obj, None, True, 4) is None
+    assert serialization._orjson_dumps({"value": None}, None, True, 4) is not None
@@ -0,0 +1,38 @@
+import pytest
+
+from meta.common import store
+from meta.common.store import FingerprintLedger
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("META_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(store, "_file_digests", None)
+    return tmp_path
+
+
+def test_ledger_drops_untouched_entries(cache_dir):
+    ledger = FingerprintLedger("test", [])
+    for key in ["kept", "looked-up", "removed"]:
+        ledger.touch(key)
+        ledger.set(key, {"fingerprint": key, "outputs": {}})
+    ledger.save()
+
+    ledger = FingerprintLedger("test", [])
+    ledger.touch("kept")
+    assert ledger.fresh_entry("looked-up", "looked-up") is not None
+    ledger.save()
+
+    assert sorted(FingerprintLedger("test", []).data) == ["kept", "looked-up"]
+
+
+def test_fingerprints_use_stored_digests(cache_dir):
+    path = cache_dir / "input.json"
+    path.write_text("{}")
+    fingerprint = FingerprintLedger.fingerprint([str(path)])
+    assert str(path) in store.file_digest_store().data
+
+    # an unchanged file is only stat'ed, so a different stored digest shows up in the fingerprint
+    stat_key, digests = store.file_digest_store().get(str(path))
+    store.file_digest_store().set(str(path), [stat_key, {**digests, "sha256": "0"}])
+    assert FingerprintLedger.fingerprint([str(path)]) != fingerprint
@@ -35,13 +35,8 @@ currentDate=$(date -I)
 upstream_git reset --hard HEAD || exit 1
 upstream_git pull
 
-python -m meta.run.update_mojang || fail_in
-python -m meta.run.update_forge || fail_in
-python -m meta.run.update_neoforge || fail_in
-python -m meta.run.update_fabric || fail_in
-python -m meta.run.update_quilt || fail_in
-python -m meta.run.update_liteloader || fail_in
-python -m meta.run.update_java || fail_in
+# resets the upstream repo by itself if any stage fails
+python -m meta.run.pipeline update || exit 1
 
 if [ "${DEPLOY_TO_GIT}" = true ]; then
     upstream_git add mojang/version_manifest_v2.json mojang/java_all.json mojang/versions/* || fail_in
@@ -50,7 +45,7 @@ if [ "${DEPLOY_TO_GIT}" = true ]; then
     upstream_git add fabric/loader-installer-json/*.json fabric/meta-v2/*.json fabric/jars/*.json || fail_in
     upstream_git add quilt/loader-installer-json/*.json quilt/meta-v3/*.json quilt/jars/*.json || fail_in
     upstream_git add liteloader/*.json || fail_in
-    upstream_git add java_runtime/adoptium/available_releases.json java_runtime/adoptium/versions/*.json java_runtime/azul/packages.json java_runtime/azul/versions/*.json java_runtime/ibm/available_releases.json java_runtime/ibm/versions/*.json || fail_in
+    upstream_git add java_runtime/adoptium/available_releases.json java_runtime/adoptium/versions/*.json java_runtime/azul/packages.json java_runtime/azul/details.json java_runtime/azul/versions/java*.json java_runtime/ibm/available_releases.json java_runtime/ibm/versions/*.json || fail_in
     if ! upstream_git diff --cached --exit-code; then
         upstream_git commit -a -m "Update ${currentDate}" || fail_in
         upstream_git push || exit 1
@@ -60,14 +55,8 @@ fi
 launcher_git reset --hard HEAD || exit 1
 launcher_git pull
 
-python -m meta.run.generate_mojang || fail_out
-python -m meta.run.generate_forge || fail_out
-python -m meta.run.generate_neoforge || fail_out
-python -m meta.run.generate_fabric || fail_out
-python -m meta.run.generate_quilt || fail_out
-python -m meta.run.generate_liteloader || fail_out
-python -m meta.run.generate_java || fail_out
-python -m meta.run.index || fail_out
+# resets the launcher repo by itself if any stage fails
+python -m meta.run.pipeline generate || exit 1
 
 if [ "${DEPLOY_TO_GIT}" = true ]; then
     launcher_git add index.json org.lwjgl/* org.lwjgl3/* net.minecraft/* || fail_out
@@ -76,7 +65,7 @@ if [ "${DEPLOY_TO_GIT}" = true ]; then
     launcher_git add net.fabricmc.fabric-loader/* net.fabricmc.intermediary/* || fail_out
     launcher_git add org.quiltmc.quilt-loader/* || fail_out # TODO: add Quilt hashed, once it is actually used
     launcher_git add com.mumfrey.liteloader/* || fail_out
-    launcher_git add net.minecraft.java/* net.adoptium.java/* com.azul.java/* com.ibm.java/* || fail_out
+    launcher_git add net.minecraft.java/* net.adoptium.java/* com.azul.java/* com.ibm.java/* net.minecraft.java.resolution/* || fail_out
 
     if ! launcher_git diff --cached --exit-code; then
         launcher_git commit -a -m "Update ${currentDate}" || fail_out